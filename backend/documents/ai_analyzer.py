@@ -2,80 +2,91 @@
 AI Analysis service using Mistral API
 """
 import os
+import re
+import functools
+import hashlib
 import logging
-import fitz  # PyMuPDF
-import requests
-import json
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from decouple import config
+from .models import Document
+from .exceptions import AnalysisServiceError
+from .utils import DatabaseService
 
 logger = logging.getLogger(__name__)
 
+# Optional orjson import for faster request encoding
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    import json
+    ORJSON_AVAILABLE = False
+
+# PDF and HTTP libraries are imported on first use: this module is loaded
+# with the URLconf (views -> tasks), so importing them here would put
+# PyMuPDF's native extension on the startup path of every process and
+# management command.
+
+# Mistral API responses worth retrying (rate limits and server errors)
+TRANSIENT_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def _open_pdf(source):
+    """Open a PDF with PyMuPDF from a file path or from its bytes"""
+    import fitz  # PyMuPDF
+    
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def _dumps(obj):
+    """Serialize obj to compact JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _cache_get(key):
+    """Read from the cache, treating backend errors as a miss"""
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+        return None
+
+
+def _cache_set(key, value, timeout):
+    """Write to the cache, ignoring backend errors"""
+    try:
+        cache.set(key, value, timeout)
+    except Exception as e:
+        logger.warning(f"Cache write failed for {key}: {e}")
+
 
 class DocumentAnalyzer:
     """Service for AI-powered document analysis"""
     
-    def __init__(self):
-        # Configure Mistral API
-        self.api_key = config('MISTRAL_API_KEY', default='')
-        if not self.api_key:
-            raise ValueError("MISTRAL_API_KEY not found in environment variables")
-        
-        self.api_url = "https://api.mistral.ai/v1/chat/completions"
-        self.model = "mistral-large-latest"
-        self.headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
+    # Characters of document text sent to Mistral, and how much text to
+    # extract (with some headroom) before the remaining pages are skipped
+    MAX_PROMPT_CHARS = 12000
+    EXTRACTION_CHAR_BUDGET = 15000
     
-    def extract_text_from_pdf(self, file_path):
-        """
-        Extract text content from PDF file using PyMuPDF
-        
-        Args:
-            file_path (str): Path to PDF file
-            
-        Returns:
-            str: Extracted text content
-        """
-        try:
-            text_content = ""
-            
-            # Open PDF document
-            pdf_document = fitz.open(file_path)
-            
-            # Extract text from each page
-            for page_num in range(len(pdf_document)):
-                page = pdf_document.load_page(page_num)
-                text_content += page.get_text()
-            
-            # Close the document
-            pdf_document.close()
-            
-            return text_content.strip()
-        
-        except Exception as e:
-            logger.error(f"Error extracting text from PDF {file_path}: {e}")
-            raise Exception(f"Failed to extract text from PDF: {str(e)}")
+    # Cache lifetimes (seconds) for Mistral results and extracted PDF text
+    ANALYSIS_CACHE_TTL = 4 * 3600
+    TEXT_CACHE_TTL = 24 * 3600
     
-    def analyze_medical_document(self, text_content, filename):
-        """
-        Send document text to Mistral for analysis
-        
-        This was the trickiest part - getting the prompt right took several tries.
-        Mistral handles medical text pretty well, better than I expected.
-        """
-        try:
-            # Create a comprehensive prompt for medical document analysis
-            prompt = f"""
-            You are a medical document analysis expert. Analyze this medical document and provide a comprehensive summary. Document filename: {filename}
-            
-            Document content:
-            {text_content[:12000]}
-            
-            IMPORTANT: Format your response EXACTLY as shown below, using bullet points (-) for lists and double asterisks (**) for headings:
-            
+    # Batched analysis: ~10k tokens of document text per request, with a
+    # marker the model must place between the per-document analyses and a
+    # "Document N" line it must start each analysis with
+    BATCH_CHAR_BUDGET = 40000
+    BATCH_DELIMITER = "===DOC_BOUNDARY==="
+    BATCH_HEADER_PATTERN = re.compile(r"[#*\s]*Document\s+(\d+)[\s*:#]*", re.IGNORECASE)
+    
+    # Expected structure of every analysis
+    ANALYSIS_FORMAT = """
             **Document Type**
             [Identify the type: prescription, lab report, medical record, discharge summary, etc.]
             
@@ -113,86 +124,444 @@ class DocumentAnalyzer:
             
             Note: If this is not a medical document, clearly state that and provide appropriate general document analysis.
             """
+    
+    # Prompt templates, built once; only the placeholders vary per call
+    _PROMPT_TEMPLATE = """
+            You are a medical document analysis expert. Analyze this medical document and provide a comprehensive summary. Document filename: {filename}
             
-    # build the request for Mistral API
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.3,  # not too creative, we want consistent medical analysis
-                "max_tokens": 2000
-            }
-            
-            # Make the API request
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                data=json.dumps(payload),
-                timeout=60
-            )
+            Document content:
+            {content}
             
-            if response.status_code != 200:
-                raise Exception(f"Mistral API error: {response.status_code} - {response.text}")
+            IMPORTANT: Format your response EXACTLY as shown below, using bullet points (-) for lists and double asterisks (**) for headings:
+            """ + ANALYSIS_FORMAT
+    
+    _BATCH_PROMPT_TEMPLATE = """
+            You are a medical document analysis expert. Analyze each of the {count} medical documents below separately and provide a comprehensive summary of each.
             
-            response_data = response.json()
-            analysis_result = response_data['choices'][0]['message']['content']
+            {sections}
             
-            return analysis_result
+            IMPORTANT: Answer the documents in the order given. Start each analysis with a line containing only "Document N", where N is the number of the document it analyzes. Put a line containing only {delimiter} between consecutive analyses and nowhere else.
+            Format each analysis EXACTLY as shown below, using bullet points (-) for lists and double asterisks (**) for headings:
+            """ + ANALYSIS_FORMAT
+    
+    def __init__(self):
+        # Configure Mistral API
+        self.api_key = config('MISTRAL_API_KEY', default='')
+        if not self.api_key:
+            raise ValueError("MISTRAL_API_KEY not found in environment variables")
+        
+        self.api_url = "https://api.mistral.ai/v1/chat/completions"
+        self.model = "mistral-large-latest"
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        # Request fields that never change, serialized once without the
+        # closing brace so _chat only has to encode the prompt.
+        # temperature: not too creative, we want consistent medical analysis
+        self._payload_prefix = _dumps({"model": self.model, "temperature": 0.3})[:-1]
+        
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
         
+        # Keep-alive connection pool so repeated calls skip the TCP+TLS
+        # handshake; transient errors and rate limits are retried with backoff
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=TRANSIENT_STATUS_CODES,
+            allowed_methods=frozenset({"POST"})
+        )
+        self.session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry))
+
+    
+    def extract_text_from_pdf(self, file_path, max_chars=None):
+        """
+        Extract text content from PDF file using PyMuPDF
+        
+        Args:
+            file_path (str): Path to PDF file
+            max_chars (int): Stop reading further pages once this many
+                characters have been extracted (None reads every page)
+            
+        Returns:
+            str: Extracted text content
+        """
+        try:
+            return self._extract_text(file_path, max_chars)
         except Exception as e:
-            logger.error(f"Error analyzing document with Mistral: {e}")
-            raise Exception(f"AI analysis failed: {str(e)}")
+            logger.error(f"Error extracting text from PDF {file_path}: {e}")
+            raise Exception(f"Failed to extract text from PDF: {str(e)}")
     
-    def analyze_document(self, document):
+    def extract_text_from_bytes(self, data, max_chars=None):
         """
-        Complete document analysis workflow
+        Extract text content from PDF bytes already in memory
+        
+        Lets callers that have read the file (e.g. to hash it) reuse the
+        bytes instead of having PyMuPDF open and read it again.
         
         Args:
-            document: Document model instance
+            data (bytes): PDF file content
+            max_chars (int): Same as for extract_text_from_pdf
             
         Returns:
-            str: Analysis result
+            str: Extracted text content
         """
         try:
-            # Update status to processing
-            document.analysis_status = 'processing'
-            document.save()
+            return self._extract_text(data, max_chars)
+        except Exception as e:
+            logger.error(f"Error extracting text from PDF bytes: {e}")
+            raise Exception(f"Failed to extract text from PDF: {str(e)}")
+    
+    def _extract_text(self, source, max_chars):
+        """Extract text from a PDF path or PDF bytes, stopping once max_chars is reached"""
+        parts = []
+        total_chars = 0
+        
+        with _open_pdf(source) as pdf_document:
+            for page in pdf_document:
+                text = page.get_text("text")
+                parts.append(text)
+                total_chars += len(text)
+                if max_chars is not None and total_chars >= max_chars:
+                    break
+        
+        return "".join(parts).strip()
+    
+    def analyze_medical_document(self, text_content, filename):
+        """
+        Send document text to Mistral for analysis
+        
+        This was the trickiest part - getting the prompt right took several tries.
+        Mistral handles medical text pretty well, better than I expected.
+        """
+        try:
+            content = text_content[:self.MAX_PROMPT_CHARS]
             
-            # Extract text from PDF
-            text_content = self.extract_text_from_pdf(document.filepath)
+            # Identical text always gets the same analysis. Only identical text:
+            # similar documents (e.g. two patients' reports on one template)
+            # must never share a result
+            cache_key = self._analysis_cache_key(content)
+            cached_result = _cache_get(cache_key)
+            if cached_result is not None:
+                return cached_result
             
-            if not text_content:
-                raise Exception("No text content could be extracted from the PDF")
+            # Create a comprehensive prompt for medical document analysis
+            prompt = self._PROMPT_TEMPLATE.format_map({"filename": filename, "content": content})
             
-            # Analyze with AI
-            analysis_result = self.analyze_medical_document(text_content, document.filename)
+            analysis_result = self._chat(prompt, max_tokens=2000)
             
-            # Update document with results
-            document.analysis_result = analysis_result
-            document.analysis_status = 'completed'
-            document.analyzed_at = timezone.now()
-            document.save()
+            _cache_set(cache_key, analysis_result, self.ANALYSIS_CACHE_TTL)
             
-            logger.info(f"Successfully analyzed document {document.id}")
             return analysis_result
         
         except Exception as e:
-            # Update status to failed
-            document.analysis_status = 'failed'
-            document.analysis_result = f"Analysis failed: {str(e)}"
-            document.save()
+            logger.error(f"Error analyzing document with Mistral: {e}")
+            # Keep transient failures recognizable so the task retries them
+            error_class = AnalysisServiceError if isinstance(e, AnalysisServiceError) else Exception
+            raise error_class(f"AI analysis failed: {str(e)}") from e
+    
+    def analyze_batch(self, documents):
+        """
+        Analyze several documents with as few Mistral requests as possible
+        
+        Documents whose file was already analyzed reuse that analysis; the
+        rest are grouped until their combined text reaches BATCH_CHAR_BUDGET
+        and each group is sent as one prompt. If a batched response can't be
+        matched back to one analysis per document, the group falls back to
+        one request per document.
+        
+        Args:
+            documents: Iterable of Document model instances
+            
+        Returns:
+            dict: Analysis result per document ID for the documents that succeeded
+        """
+        results = {}
+        pending = []
+        
+        for document in documents:
+            try:
+                # A byte-identical file that was already analyzed needs no work
+                prior_result = self._copy_prior_analysis(document)
+                if prior_result is not None:
+                    results[document.id] = prior_result
+                    continue
+                
+                self._mark_processing(document)
+                
+                text_content = self.get_document_text(document)
+                content = text_content[:self.MAX_PROMPT_CHARS]
+                cached_result = _cache_get(self._analysis_cache_key(content))
+                if cached_result is not None:
+                    self._mark_completed(document, cached_result)
+                    results[document.id] = cached_result
+                else:
+                    pending.append((document, content))
+            except Exception as e:
+                self._mark_failed(document, e)
+        
+        # Greedily pack documents into batches that fit the character budget
+        batches, batch, batch_chars = [], [], 0
+        for item in pending:
+            if batch and batch_chars + len(item[1]) > self.BATCH_CHAR_BUDGET:
+                batches.append(batch)
+                batch, batch_chars = [], 0
+            batch.append(item)
+            batch_chars += len(item[1])
+        if batch:
+            batches.append(batch)
+        
+        for batch in batches:
+            analyses = self._analyze_batch_prompt(batch) if len(batch) > 1 else None
             
-            logger.error(f"Document analysis failed for {document.id}: {e}")
-            raise e
+            for index, (document, content) in enumerate(batch):
+                try:
+                    if analyses is not None:
+                        analysis_result = analyses[index]
+                        _cache_set(self._analysis_cache_key(content), analysis_result, self.ANALYSIS_CACHE_TTL)
+                    else:
+                        analysis_result = self.analyze_medical_document(content, document.filename)
+                    self._mark_completed(document, analysis_result)
+                    results[document.id] = analysis_result
+                except Exception as e:
+                    self._mark_failed(document, e)
+        
+        return results
+    
+    def _analyze_batch_prompt(self, batch):
+        """
+        Send one prompt covering every document in a batch
+        
+        Each section of the reply must open with the "Document N" line of
+        the document in that position; a missing, extra or out-of-order
+        section rejects the whole reply rather than risk attaching an
+        analysis to the wrong document.
+        
+        Returns:
+            list: One analysis per document in order, or None if the
+            response couldn't be split reliably
+        """
+        sections = "\n---\n".join(
+            f"Analyze document {number} (filename: {document.filename}):\n{content}"
+            for number, (document, content) in enumerate(batch, start=1)
+        )
+        prompt = self._BATCH_PROMPT_TEMPLATE.format_map({
+            "count": len(batch),
+            "sections": sections,
+            "delimiter": self.BATCH_DELIMITER
+        })
+        
+        try:
+            response_text = self._chat(prompt, max_tokens=2000 * len(batch))
+        except Exception as e:
+            logger.warning(f"Batched analysis request failed, falling back to single requests: {e}")
+            return None
+        
+        sections = [part.strip() for part in response_text.split(self.BATCH_DELIMITER)]
+        if len(sections) != len(batch):
+            logger.warning(
+                f"Batched analysis returned {len(sections)} sections for {len(batch)} documents, "
+                f"falling back to single requests"
+            )
+            return None
+        
+        analyses = []
+        for number, section in enumerate(sections, start=1):
+            header, _, analysis = section.partition("\n")
+            match = self.BATCH_HEADER_PATTERN.fullmatch(header)
+            if match is None or int(match.group(1)) != number or not analysis.strip():
+                logger.warning(
+                    f"Batched analysis section {number} does not start with its document header "
+                    f"({header[:40]!r}), falling back to single requests"
+                )
+                return None
+            analyses.append(analysis.strip())
+        
+        return analyses
+    
+    def _chat(self, prompt, max_tokens):
+        """Send a single-message chat completion to Mistral and return the reply text"""
+        # build the request for Mistral API on top of the pre-encoded fields
+        body = b"".join([
+            self._payload_prefix,
+            b',"max_tokens":', str(max_tokens).encode(),
+            b',"messages":[{"role":"user","content":', _dumps(prompt), b'}]}',
+        ])
+        
+        import requests
+        
+        # Make the API request (the session already sends the JSON content type).
+        # Connection problems, timeouts and 5xx/429 responses that outlast
+        # the session's own retries are transient; anything else is not.
+        try:
+            response = self.session.post(self.api_url, data=body, timeout=60)
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.RetryError) as e:
+            raise AnalysisServiceError(f"Mistral API unavailable: {e}") from e
+        
+        if response.status_code != 200:
+            error_class = AnalysisServiceError if response.status_code in TRANSIENT_STATUS_CODES else Exception
+            raise error_class(f"Mistral API error: {response.status_code} - {response.text}")
+        
+        response_data = response.json()
+        return response_data['choices'][0]['message']['content']
+    
+    def _analysis_cache_key(self, content):
+        """
+        Cache key for the analysis of some document text
+        
+        The text is hashed with runs of whitespace collapsed, so the same
+        report extracted with different spacing or line breaks matches;
+        any difference in the words themselves gives a different key.
+        """
+        normalized = " ".join(content.split())
+        return f"mistral:{hashlib.sha256(normalized.encode()).hexdigest()}:{self.model}"
+    
+    def get_document_text(self, document):
+        """
+        Get the text of a document for analysis
+        
+        The text is extracted once (normally by extract_document_text_task
+        right after upload) and kept on the document, so repeated or retried
+        analyses do not parse the PDF again.
+        
+        Args:
+            document: Document model instance
+            
+        Returns:
+            str: Extracted text content
+        """
+        if document.extracted_text:
+            return document.extracted_text
+        
+        # Text is cached by file hash, so re-uploads of the same file skip
+        # PDF parsing entirely. Uploads are hashed when stored; PyMuPDF then
+        # opens the file by path and only reads the pages it extracts,
+        # instead of the whole file being read into memory here.
+        if document.content_sha256:
+            data = None
+            text_cache_key = f"pdf_text:{document.content_sha256}"
+        else:
+            # Older documents: read the file once, to hash and to parse
+            with open(document.filepath, 'rb') as pdf_file:
+                data = pdf_file.read()
+            text_cache_key = f"pdf_text:{hashlib.sha256(data).hexdigest()}"
+        
+        text_content = _cache_get(text_cache_key)
+        if text_content is None:
+            if data is None:
+                text_content = self.extract_text_from_pdf(document.filepath, max_chars=self.EXTRACTION_CHAR_BUDGET)
+            else:
+                text_content = self.extract_text_from_bytes(data, max_chars=self.EXTRACTION_CHAR_BUDGET)
+            _cache_set(text_cache_key, text_content, self.TEXT_CACHE_TTL)
+        
+        if not text_content:
+            raise Exception("No text content could be extracted from the PDF")
+        
+        # Single-column UPDATE; the document's status may be changing
+        # concurrently and must not be written back
+        Document.objects.filter(pk=document.pk).update(extracted_text=text_content)
+        document.extracted_text = text_content
+        return text_content
+    
+    def _mark_processing(self, document):
+        """Flag the document as being analyzed and refresh its claim"""
+        # Status-only UPDATE; no need to write the whole row back
+        Document.objects.filter(pk=document.pk).update(
+            analysis_status=Document.Status.PROCESSING,
+            analysis_claimed_at=timezone.now()
+        )
+        document.analysis_status = Document.Status.PROCESSING
+        # update() sends no post_save, so drop the cached list here
+        DatabaseService.invalidate_document_list()
+    
+    def _mark_completed(self, document, analysis_result):
+        """Store a successful analysis on the document"""
+        document.analysis_result = analysis_result
+        document.analysis_status = Document.Status.COMPLETED
+        document.analyzed_at = timezone.now()
+        document.save(update_fields=['analysis_result', 'analysis_status', 'analyzed_at'])
+    
+    def _mark_failed(self, document, error):
+        """Record a failed analysis on the document"""
+        DatabaseService.mark_analysis_failed(document.id, error)
+        document.analysis_status = Document.Status.FAILED
+        document.analysis_result = f"Analysis failed: {str(error)}"
+    
+    def _copy_prior_analysis(self, document):
+        """
+        Reuse the analysis of an earlier upload with the same content
+        
+        Args:
+            document: Document model instance
+            
+        Returns:
+            str: Copied analysis result, or None if there is none to reuse
+        """
+        if not document.content_sha256:
+            return None
+        
+        prior = (
+            Document.objects
+            .filter(content_sha256=document.content_sha256, analysis_status=Document.Status.COMPLETED)
+            .exclude(pk=document.pk)
+            .only('analysis_result')
+            .first()
+        )
+        if prior is None:
+            return None
+        
+        self._mark_completed(document, prior.analysis_result)
+        logger.info(f"Reused analysis of document {prior.id} for identical document {document.id}")
+        return prior.analysis_result
+    
+    def analyze_document(self, document):
+        """
+        Complete document analysis workflow
+        
+        Failures are raised, not recorded: the caller decides whether the
+        analysis is retried or marked as failed.
+        
+        Args:
+            document: Document model instance
+            
+        Returns:
+            str: Analysis result
+        """
+        # A byte-identical file that was already analyzed needs no work
+        prior_result = self._copy_prior_analysis(document)
+        if prior_result is not None:
+            return prior_result
+        
+        # Update status to processing
+        self._mark_processing(document)
+        
+        text_content = self.get_document_text(document)
+        
+        # Analyze with AI
+        analysis_result = self.analyze_medical_document(text_content, document.filename)
+        
+        # Update document with results
+        self._mark_completed(document, analysis_result)
+        
+        logger.info(f"Successfully analyzed document {document.id}")
+        return analysis_result
 
 
 # Utility functions
+@functools.lru_cache(maxsize=1)
 def get_analyzer():
-    """Get configured document analyzer instance"""
+    """
+    Get the shared document analyzer instance
+    
+    The analyzer (and its connection pool) is created once per process.
+    Changes to MISTRAL_API_KEY need a process restart or
+    get_analyzer.cache_clear() to take effect.
+    """
     try:
         return DocumentAnalyzer()
     except ValueError as e:
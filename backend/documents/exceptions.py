@@ -29,6 +29,29 @@ class DocumentNotFoundError(DocumentError):
     pass
 
 
+class AnalysisServiceError(DocumentError):
+    """Exception raised when the AI service fails in a way worth retrying"""
+    pass
+
+
+# Response message for each status code returned by DRF's handler
+_STATUS_MESSAGES = {
+    400: 'Invalid request data',
+    401: 'Authentication required',
+    403: 'Permission denied',
+    404: 'Resource not found',
+    405: 'Method not allowed',
+    500: 'Internal server error',
+}
+
+# Custom exceptions DRF does not handle: (exception class, status, message)
+_CUSTOM_EXCEPTIONS = (
+    (FileStorageError, status.HTTP_500_INTERNAL_SERVER_ERROR, 'File storage error'),
+    (FileValidationError, status.HTTP_400_BAD_REQUEST, 'File validation error'),
+    (DocumentNotFoundError, status.HTTP_404_NOT_FOUND, 'Document not found'),
+)
+
+
 def custom_exception_handler(exc, context):
     """
     Custom exception handler that provides consistent error responses
@@ -41,55 +64,23 @@ def custom_exception_handler(exc, context):
     
     if response is not None:
         # Customize the response format
-        custom_response_data = {
+        response.data = {
             'error': True,
-            'message': 'An error occurred',
+            'message': _STATUS_MESSAGES.get(response.status_code, 'An error occurred'),
             'details': response.data,
             'status_code': response.status_code
         }
-        
-        # Handle specific error types
-        if response.status_code == 400:
-            custom_response_data['message'] = 'Invalid request data'
-        elif response.status_code == 401:
-            custom_response_data['message'] = 'Authentication required'
-        elif response.status_code == 403:
-            custom_response_data['message'] = 'Permission denied'
-        elif response.status_code == 404:
-            custom_response_data['message'] = 'Resource not found'
-        elif response.status_code == 405:
-            custom_response_data['message'] = 'Method not allowed'
-        elif response.status_code == 500:
-            custom_response_data['message'] = 'Internal server error'
-        
-        response.data = custom_response_data
+        return response
     
     # Handle custom exceptions
-    elif isinstance(exc, FileStorageError):
-        custom_response_data = {
-            'error': True,
-            'message': 'File storage error',
-            'details': str(exc),
-            'status_code': 500
-        }
-        response = Response(custom_response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    elif isinstance(exc, FileValidationError):
-        custom_response_data = {
-            'error': True,
-            'message': 'File validation error',
-            'details': str(exc),
-            'status_code': 400
-        }
-        response = Response(custom_response_data, status=status.HTTP_400_BAD_REQUEST)
-    
-    elif isinstance(exc, DocumentNotFoundError):
-        custom_response_data = {
-            'error': True,
-            'message': 'Document not found',
-            'details': str(exc),
-            'status_code': 404
-        }
-        response = Response(custom_response_data, status=status.HTTP_404_NOT_FOUND)
+    for exc_class, status_code, message in _CUSTOM_EXCEPTIONS:
+        if isinstance(exc, exc_class):
+            custom_response_data = {
+                'error': True,
+                'message': message,
+                'details': str(exc),
+                'status_code': status_code
+            }
+            return Response(custom_response_data, status=status_code)
     
-    return response
\ No newline at end of file
+    return response
@@ -0,0 +1,54 @@
+"""
+Custom model fields for document management
+"""
+import zlib
+from django import forms
+from django.db import models
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    Text stored zlib-compressed in a binary column
+    
+    The attribute reads and writes plain strings; compression only happens
+    at the database boundary. Meant for large text that is never filtered
+    on, such as AI analysis output. Unlike BinaryField it is editable by
+    default and gets a textarea in model forms (e.g. the admin), like a
+    TextField.
+    """
+    
+    COMPRESSION_LEVEL = 6
+    
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+    
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        # Only record editable when it differs from this field's default
+        if self.editable:
+            del kwargs['editable']
+        else:
+            kwargs['editable'] = False
+        return name, path, args, kwargs
+    
+    def formfield(self, **kwargs):
+        return super().formfield(**{'widget': forms.Textarea, **kwargs})
+    
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return zlib.decompress(value).decode('utf-8')
+    
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return zlib.decompress(value).decode('utf-8')
+    
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, str):
+            value = zlib.compress(value.encode('utf-8'), self.COMPRESSION_LEVEL)
+        return super().get_db_prep_value(value, connection, prepared)
+    
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-15 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_document_analysis_result_document_analysis_status_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namespace', models.CharField(help_text='Model the analysis was produced with', max_length=100)),
+                ('embedding', models.BinaryField(help_text='Unit-length float32 document embedding')),
+                ('analysis_result', models.TextField(help_text='Cached AI analysis result')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'analysis_cache',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['namespace', '-created_at'], name='analysis_cache_ns_created_idx')],
+            },
+        ),
+    ]
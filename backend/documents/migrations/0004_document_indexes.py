@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-15 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_analysiscacheentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['-created_at'], name='documents_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['analysis_status', '-created_at'], name='documents_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.16 on 2026-10-15 07:20
+
+from django.db import migrations, models
+
+
+STATUS_CODES = {
+    'pending': 0,
+    'processing': 1,
+    'completed': 2,
+    'failed': 3,
+}
+
+
+def status_names_to_codes(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+    for name, code in STATUS_CODES.items():
+        Document.objects.filter(analysis_status=name).update(analysis_status_code=code)
+
+
+def status_codes_to_names(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+    for name, code in STATUS_CODES.items():
+        Document.objects.filter(analysis_status_code=code).update(analysis_status=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0004_document_indexes'),
+    ]
+
+    operations = [
+        # Strings can't be cast to integers in place, so copy the
+        # statuses into a new column and swap it in
+        migrations.AddField(
+            model_name='document',
+            name='analysis_status_code',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(status_names_to_codes, status_codes_to_names),
+        migrations.RemoveIndex(
+            model_name='document',
+            name='documents_status_created_idx',
+        ),
+        migrations.RemoveField(
+            model_name='document',
+            name='analysis_status',
+        ),
+        migrations.RenameField(
+            model_name='document',
+            old_name='analysis_status_code',
+            new_name='analysis_status',
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='analysis_status',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Pending'), (1, 'Processing'), (2, 'Completed'), (3, 'Failed')], default=0, help_text='Analysis status'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['analysis_status', '-created_at'], name='documents_status_created_idx'),
+        ),
+    ]
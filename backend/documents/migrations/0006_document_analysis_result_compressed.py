@@ -0,0 +1,52 @@
+# Generated by Django 4.2.16 on 2026-10-15 07:30
+
+from django.db import migrations
+import documents.fields
+
+
+def compress_analysis_results(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+    documents = Document.objects.exclude(analysis_result=None).only('pk', 'analysis_result')
+    for document in documents.iterator():
+        document.analysis_result_compressed = document.analysis_result
+        document.save(update_fields=['analysis_result_compressed'])
+
+
+def decompress_analysis_results(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+    documents = Document.objects.exclude(analysis_result_compressed=None).only('pk', 'analysis_result_compressed')
+    for document in documents.iterator():
+        document.analysis_result = document.analysis_result_compressed
+        document.save(update_fields=['analysis_result'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0005_document_analysis_status_integer'),
+    ]
+
+    operations = [
+        # Text can't be converted to compressed bytes in place, so copy the
+        # results into a new column and swap it in
+        migrations.AddField(
+            model_name='document',
+            name='analysis_result_compressed',
+            field=documents.fields.CompressedTextField(blank=True, null=True),
+        ),
+        migrations.RunPython(compress_analysis_results, decompress_analysis_results),
+        migrations.RemoveField(
+            model_name='document',
+            name='analysis_result',
+        ),
+        migrations.RenameField(
+            model_name='document',
+            old_name='analysis_result_compressed',
+            new_name='analysis_result',
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='analysis_result',
+            field=documents.fields.CompressedTextField(blank=True, help_text='AI analysis result (stored compressed)', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-15 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0006_document_analysis_result_compressed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='content_sha256',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the file content', max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.16 on 2026-10-15 07:42
+
+from django.db import migrations
+import documents.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0008_document_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='extracted_text',
+            field=documents.fields.CompressedTextField(blank=True, help_text='PDF text used for analysis, extracted after upload (stored compressed)', null=True),
+        ),
+    ]
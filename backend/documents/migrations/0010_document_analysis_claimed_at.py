@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-15 07:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0009_document_extracted_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='analysis_claimed_at',
+            field=models.DateTimeField(blank=True, help_text='When the current analysis was queued or last attempted', null=True),
+        ),
+    ]
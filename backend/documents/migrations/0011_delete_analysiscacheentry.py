@@ -0,0 +1,16 @@
+# Generated by Django 4.2.16 on 2026-10-15 08:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0010_document_analysis_claimed_at'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='AnalysisCacheEntry',
+        ),
+    ]
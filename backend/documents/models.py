@@ -1,42 +1,123 @@
-from django.db import models
+from django.db import models, transaction
+from .fields import CompressedTextField
 import os
 
 
+def _remove_stored_files(files):
+    """
+    Unlink stored document files that no remaining document uses
+    
+    Args:
+        files: (filepath, content_sha256) pairs of deleted documents
+    """
+    from .utils import DatabaseService
+    
+    # Content-addressed files are shared by documents with the same content.
+    # The digests stay locked from the reference check until the files are
+    # gone, so an upload of the same content cannot reuse one in between
+    # (locks are taken in a fixed order to avoid deadlocks)
+    digests = sorted({content_sha256 for _, content_sha256 in files if content_sha256})
+    with transaction.atomic():
+        for content_sha256 in digests:
+            DatabaseService.lock_content(content_sha256)
+        in_use = set(
+            Document.objects
+            .filter(content_sha256__in=digests)
+            .values_list('filepath', flat=True)
+        ) if digests else set()
+        
+        for filepath, _ in files:
+            if filepath and filepath not in in_use:
+                try:
+                    os.remove(filepath)
+                except OSError:
+                    pass  # File might already be deleted
+
+
+class DocumentQuerySet(models.QuerySet):
+    """QuerySet that removes the physical files of deleted documents"""
+    
+    def delete(self):
+        """Bulk delete the rows, then unlink their files once that commits"""
+        from .utils import DatabaseService
+        
+        files = list(self.values_list('filepath', 'content_sha256'))
+        result = super().delete()
+        # Runs immediately in autocommit; inside a transaction, only if it
+        # commits, so a rolled-back delete never loses its files
+        transaction.on_commit(lambda: _remove_stored_files(files))
+        transaction.on_commit(DatabaseService.invalidate_document_list)
+        return result
+
+
 class Document(models.Model):
     """Model for storing document metadata"""
     
+    class Status(models.IntegerChoices):
+        """AI analysis status, stored as a small integer"""
+        PENDING = 0, 'Pending'
+        PROCESSING = 1, 'Processing'
+        COMPLETED = 2, 'Completed'
+        FAILED = 3, 'Failed'
+    
     filename = models.CharField(max_length=255, help_text="Original filename")
     filepath = models.CharField(max_length=500, help_text="Path to stored file")
     filesize = models.BigIntegerField(help_text="File size in bytes")
+    content_sha256 = models.CharField(
+        max_length=64,
+        db_index=True,
+        blank=True,
+        null=True,
+        help_text="SHA-256 of the file content"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     
     # AI Analysis fields
-    analysis_result = models.TextField(blank=True, null=True, help_text="AI analysis result")
-    analysis_status = models.CharField(
-        max_length=20, 
-        choices=[
-            ('pending', 'Pending'),
-            ('processing', 'Processing'),
-            ('completed', 'Completed'),
-            ('failed', 'Failed')
-        ],
-        default='pending',
+    analysis_result = CompressedTextField(blank=True, null=True, help_text="AI analysis result (stored compressed)")
+    analysis_status = models.PositiveSmallIntegerField(
+        choices=Status.choices,
+        default=Status.PENDING,
         help_text="Analysis status"
     )
     analyzed_at = models.DateTimeField(blank=True, null=True, help_text="When analysis was completed")
+    analysis_claimed_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the current analysis was queued or last attempted"
+    )
+    extracted_text = CompressedTextField(
+        blank=True,
+        null=True,
+        help_text="PDF text used for analysis, extracted after upload (stored compressed)"
+    )
+    
+    objects = DocumentQuerySet.as_manager()
     
     class Meta:
         db_table = 'documents'
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Backs the newest-first ordering; id breaks ties so keyset
+            # pagination on (created_at, id) is stable
+            models.Index(fields=['-created_at', '-id'], name='documents_created_id_idx'),
+            # Status polling (pending/processing), newest first
+            models.Index(fields=['analysis_status', '-created_at'], name='documents_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.filename} ({self.filesize} bytes)"
     
+    @property
+    def analysis_status_name(self):
+        """Analysis status as exposed by the API ('pending', 'processing', ...)"""
+        return self.Status(self.analysis_status).name.lower()
+    
     def delete(self, *args, **kwargs):
-        """Override delete to also remove the physical file"""
-        if self.filepath and os.path.exists(self.filepath):
-            try:
-                os.remove(self.filepath)
-            except OSError:
-                pass  # File might already be deleted
-        super().delete(*args, **kwargs)
\ No newline at end of file
+        """Override delete to also remove the physical file once the delete commits"""
+        from .utils import DatabaseService
+        
+        files = [(self.filepath, self.content_sha256)]
+        result = super().delete(*args, **kwargs)
+        transaction.on_commit(lambda: _remove_stored_files(files))
+        transaction.on_commit(DatabaseService.invalidate_document_list)
+        return result
@@ -0,0 +1,44 @@
+"""
+Response renderers for the documents API
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+# Optional orjson import for faster JSON encoding
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Types orjson does not handle natively (lazy translations, Decimal, ...)
+# and datetimes (passed through so they keep DRF's format) are converted
+# by DRF's own encoder
+_DRF_ENCODER = encoders.JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed
+    
+    Output matches DRF's JSONRenderer with the default settings (compact,
+    UTF-8, U+2028/U+2029 escaped). Indented output, requested through the
+    Accept header, still goes through the standard renderer.
+    """
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        
+        if not ORJSON_AVAILABLE or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        ret = orjson.dumps(
+            data,
+            default=_DRF_ENCODER.default,
+            # Non-str keys are stringified like the json module does
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        )
+        
+        # Same escaping as JSONRenderer, so the output is valid JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -4,15 +4,58 @@ from .validators import DocumentValidator, InputValidator
 from .exceptions import FileValidationError
 
 
+class AnalysisStatusField(serializers.ReadOnlyField):
+    """Exposes the integer analysis status by name ('pending', 'completed', ...)"""
+    
+    def to_representation(self, value):
+        return Document.Status(value).name.lower()
+
+
 class DocumentSerializer(serializers.ModelSerializer):
     """Serializer for Document model"""
     
+    analysis_status = AnalysisStatusField()
+    
     class Meta:
         model = Document
         fields = ['id', 'filename', 'filesize', 'created_at', 'analysis_status', 'analyzed_at']
         read_only_fields = ['id', 'created_at', 'analysis_status', 'analyzed_at']
 
 
+# Field used to format datetimes of list rows exactly as DocumentSerializer
+# does, and the API name of each analysis status
+_DATETIME_FIELD = serializers.DateTimeField(read_only=True)
+_STATUS_NAMES = {status.value: status.name.lower() for status in Document.Status}
+
+
+def document_list_rows(rows):
+    """
+    Render document list rows the way DocumentSerializer renders documents
+    
+    The list endpoints work on .values() dicts (DatabaseService.DOCUMENT_LIST_FIELDS),
+    so only the status and the datetimes need converting; doing that directly
+    avoids running a serializer and its fields for every row.
+    
+    Args:
+        rows: Dicts with the DOCUMENT_LIST_FIELDS of documents
+        
+    Returns:
+        list: Dicts ready for JSON rendering
+    """
+    format_datetime = _DATETIME_FIELD.to_representation
+    return [
+        {
+            'id': row['id'],
+            'filename': row['filename'],
+            'filesize': row['filesize'],
+            'created_at': format_datetime(row['created_at']),
+            'analysis_status': _STATUS_NAMES[row['analysis_status']],
+            'analyzed_at': format_datetime(row['analyzed_at']),
+        }
+        for row in rows
+    ]
+
+
 class DocumentUploadSerializer(serializers.Serializer):
     """Serializer for document upload with comprehensive validation"""
     
@@ -51,4 +94,4 @@ class DocumentDetailSerializer(serializers.ModelSerializer):
     def get_file_exists(self, obj):
         """Check if the physical file still exists"""
         from .utils import DocumentStorageService
-        return DocumentStorageService.file_exists(obj.filepath)
\ No newline at end of file
+        return DocumentStorageService.file_exists(obj.filepath)
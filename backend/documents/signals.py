@@ -0,0 +1,20 @@
+"""
+Signal handlers for document management
+"""
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Document
+from .utils import DatabaseService
+
+
+@receiver(post_save, sender=Document)
+def invalidate_document_list_on_save(sender, **kwargs):
+    """Uploads and analysis status changes alter the document list"""
+    # Once committed, so a concurrent read cannot cache the list without the row
+    transaction.on_commit(DatabaseService.invalidate_document_list)
+
+
+# Deletes invalidate the list in Document.delete and DocumentQuerySet.delete
+# rather than through post_delete: a post_delete receiver would make every
+# queryset delete load full rows (analysis blob included) to send the signal.
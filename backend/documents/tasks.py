@@ -0,0 +1,104 @@
+"""
+Background tasks for document processing
+"""
+import logging
+from celery import shared_task
+from .models import Document
+from .ai_analyzer import get_analyzer
+from .utils import DatabaseService
+from .exceptions import AnalysisServiceError
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3)
+def analyze_document_task(self, document_id):
+    """
+    Run AI analysis for a document outside the request cycle
+    
+    Args:
+        document_id: ID of the document to analyze
+        
+    Returns:
+        str: Analysis result, or None if the document no longer exists
+    """
+    try:
+        document = Document.objects.get(pk=document_id)
+        
+        analyzer = get_analyzer()
+        if not analyzer:
+            raise RuntimeError("AI analyzer not available. Please check MISTRAL_API_KEY configuration.")
+        
+        return analyzer.analyze_document(document)
+    except Document.DoesNotExist:
+        logger.warning(f"Document {document_id} was deleted before analysis could run")
+        return None
+    except AnalysisServiceError as e:
+        # Only Mistral outages are retried; anything else would fail again.
+        # The document stays processing until the last attempt, so the
+        # analyze endpoint won't queue a second task in the meantime.
+        if self.request.retries < self.max_retries:
+            # Back off 10s, 20s, 40s between attempts
+            raise self.retry(exc=e, countdown=10 * 2 ** self.request.retries)
+        DatabaseService.mark_analysis_failed(document_id, e)
+        raise
+    except Exception as e:
+        DatabaseService.mark_analysis_failed(document_id, e)
+        raise
+
+
+@shared_task(ignore_result=True)
+def extract_document_text_task(document_ids):
+    """
+    Extract and store the text of new documents ahead of analysis
+    
+    Queued on upload (once per request, bulk uploads included) so that
+    analyze_document_task finds the text already on the documents.
+    Failures are only logged: analysis extracts the text itself when it
+    is missing.
+    
+    Args:
+        document_ids: IDs of the uploaded documents
+    """
+    analyzer = get_analyzer()
+    if not analyzer:
+        return  # Nothing can be analyzed without MISTRAL_API_KEY
+    
+    documents = Document.objects.only('id', 'filepath', 'content_sha256', 'extracted_text').filter(pk__in=document_ids)
+    for document in documents:
+        try:
+            analyzer.get_document_text(document)
+        except Exception as e:
+            logger.warning(f"Text extraction failed for document {document.id}: {e}")
+
+
+@shared_task
+def analyze_documents_batch_task(document_ids):
+    """
+    Analyze several documents, sharing Mistral requests between them
+    
+    Queued by the bulk analyze endpoint for documents it has claimed.
+    Failures are not retried: each document is marked failed instead.
+    
+    Args:
+        document_ids: IDs of the documents to analyze
+        
+    Returns:
+        dict: Analysis result per document ID for the documents that succeeded
+    """
+    try:
+        analyzer = get_analyzer()
+        if not analyzer:
+            raise RuntimeError("AI analyzer not available. Please check MISTRAL_API_KEY configuration.")
+        
+        documents = Document.objects.filter(pk__in=document_ids)
+        return analyzer.analyze_batch(documents)
+    except Exception as e:
+        # Documents the batch did not get to must not stay processing
+        unfinished = Document.objects.filter(
+            pk__in=document_ids,
+            analysis_status=Document.Status.PROCESSING
+        ).values_list('id', flat=True)
+        for document_id in unfinished:
+            DatabaseService.mark_analysis_failed(document_id, e)
+        raise
@@ -0,0 +1,40 @@
+"""
+Tests for the document admin
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from documents.models import Document
+
+
+class DocumentAdminTests(TestCase):
+    """The compressed analysis result can be viewed and edited in the admin"""
+    
+    def setUp(self):
+        admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        self.document = Document.objects.create(
+            filename='report.pdf',
+            filepath='/nonexistent/report.pdf',
+            filesize=1024,
+            analysis_status=Document.Status.COMPLETED,
+            analysis_result='**Document Type**\nLab report'
+        )
+        self.url = f'/admin/documents/document/{self.document.pk}/change/'
+    
+    def test_change_form_shows_analysis_result(self):
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'name="analysis_result"')
+        self.assertContains(response, 'Lab report')
+    
+    def test_analysis_result_can_be_edited(self):
+        form = self.client.get(self.url).context['adminform'].form
+        data = {name: value for name, value in form.initial.items() if value is not None}
+        data['analysis_result'] = '**Document Type**\nPrescription'
+        
+        response = self.client.post(self.url, data)
+        
+        self.assertEqual(response.status_code, 302)
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.analysis_result, '**Document Type**\nPrescription')
@@ -0,0 +1,67 @@
+"""
+Tests for reuse of AI analysis results between documents
+"""
+import os
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from documents.ai_analyzer import DocumentAnalyzer
+
+REPORT_TEMPLATE = """
+City Hospital Laboratory - Complete Blood Count
+Patient: {name}    DOB: {dob}
+Hemoglobin: {hemoglobin} g/dL    (13.5 - 17.5)
+White blood cells: {wbc} x10^9/L    (4.5 - 11.0)
+Platelets: 250 x10^9/L    (150 - 400)
+"""
+
+
+class AnalysisCacheTests(SimpleTestCase):
+    """Cached analyses are only reused for the same document text"""
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with mock.patch.dict(os.environ, {'MISTRAL_API_KEY': 'test'}):
+            self.analyzer = DocumentAnalyzer()
+        
+        # Each Mistral call returns a distinct analysis
+        self.calls = []
+        
+        def chat(prompt, max_tokens):
+            self.calls.append(prompt)
+            return f"analysis {len(self.calls)}"
+        
+        chat_patch = mock.patch.object(self.analyzer, '_chat', side_effect=chat)
+        chat_patch.start()
+        self.addCleanup(chat_patch.stop)
+    
+    def test_different_lab_reports_never_share_a_result(self):
+        first = REPORT_TEMPLATE.format(name='Jane Doe', dob='1980-02-03', hemoglobin='13.9', wbc='6.1')
+        second = REPORT_TEMPLATE.format(name='John Roe', dob='1975-11-20', hemoglobin='9.8', wbc='14.2')
+        
+        first_result = self.analyzer.analyze_medical_document(first, 'report.pdf')
+        second_result = self.analyzer.analyze_medical_document(second, 'report.pdf')
+        
+        self.assertNotEqual(first_result, second_result)
+        self.assertEqual(len(self.calls), 2)
+        self.assertIn('John Roe', self.calls[1])
+    
+    def test_single_value_difference_is_not_reused(self):
+        first = REPORT_TEMPLATE.format(name='Jane Doe', dob='1980-02-03', hemoglobin='13.9', wbc='6.1')
+        second = REPORT_TEMPLATE.format(name='Jane Doe', dob='1980-02-03', hemoglobin='13.8', wbc='6.1')
+        
+        self.analyzer.analyze_medical_document(first, 'report.pdf')
+        self.analyzer.analyze_medical_document(second, 'report.pdf')
+        
+        self.assertEqual(len(self.calls), 2)
+    
+    def test_same_text_with_different_spacing_is_reused(self):
+        report = REPORT_TEMPLATE.format(name='Jane Doe', dob='1980-02-03', hemoglobin='13.9', wbc='6.1')
+        respaced = "\n\n".join(" ".join(line.split()) for line in report.splitlines())
+        
+        first_result = self.analyzer.analyze_medical_document(report, 'report.pdf')
+        second_result = self.analyzer.analyze_medical_document(respaced, 'copy.pdf')
+        
+        self.assertEqual(first_result, second_result)
+        self.assertEqual(len(self.calls), 1)
@@ -0,0 +1,103 @@
+"""
+Tests for batched AI analysis
+"""
+import os
+import re
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase
+from documents.ai_analyzer import DocumentAnalyzer
+from documents.models import Document
+
+
+class BatchAnalysisTests(TestCase):
+    """Batched replies are only used when every section names its document"""
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with mock.patch.dict(os.environ, {'MISTRAL_API_KEY': 'test'}):
+            self.analyzer = DocumentAnalyzer()
+        
+        # Batched prompts get self.batch_reply; single prompts an analysis
+        # naming their file
+        self.calls = []
+        self.batch_reply = None
+        
+        def chat(prompt, max_tokens):
+            self.calls.append(prompt)
+            filename = re.search(r"Document filename: (\S+)", prompt)
+            if filename:
+                return f"single analysis of {filename.group(1)}"
+            return self.batch_reply
+        
+        chat_patch = mock.patch.object(self.analyzer, '_chat', side_effect=chat)
+        chat_patch.start()
+        self.addCleanup(chat_patch.stop)
+        
+        self.first = self.create_document('first.pdf', 'Hemoglobin: 13.9 g/dL', 'a' * 64)
+        self.second = self.create_document('second.pdf', 'Hemoglobin: 9.8 g/dL', 'b' * 64)
+    
+    def create_document(self, filename, text, content_sha256, **fields):
+        return Document.objects.create(
+            filename=filename,
+            filepath=f'/nonexistent/{filename}',
+            filesize=1024,
+            content_sha256=content_sha256,
+            extracted_text=text,
+            **fields
+        )
+    
+    def reply(self, *sections):
+        return f"\n{DocumentAnalyzer.BATCH_DELIMITER}\n".join(sections)
+    
+    def analyze(self):
+        documents = Document.objects.filter(pk__in=[self.first.pk, self.second.pk]).order_by('pk')
+        return self.analyzer.analyze_batch(documents)
+    
+    def test_sections_are_matched_by_their_headers(self):
+        self.batch_reply = self.reply(
+            "**Document 1**\nanalysis of the first report",
+            "Document 2:\nanalysis of the second report",
+        )
+        
+        results = self.analyze()
+        
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(results[self.first.pk], "analysis of the first report")
+        self.assertEqual(results[self.second.pk], "analysis of the second report")
+    
+    def test_reordered_reply_falls_back_to_single_requests(self):
+        self.batch_reply = self.reply(
+            "Document 2\nanalysis of the second report",
+            "Document 1\nanalysis of the first report",
+        )
+        
+        results = self.analyze()
+        
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(results[self.first.pk], "single analysis of first.pdf")
+        self.assertEqual(results[self.second.pk], "single analysis of second.pdf")
+    
+    def test_section_without_header_falls_back_to_single_requests(self):
+        self.batch_reply = self.reply(
+            "Document 1\nanalysis of the first report",
+            "analysis of the second report",
+        )
+        
+        results = self.analyze()
+        
+        self.assertEqual(results[self.second.pk], "single analysis of second.pdf")
+    
+    def test_identical_file_reuses_prior_analysis(self):
+        self.create_document(
+            'earlier.pdf', 'Hemoglobin: 13.9 g/dL', 'a' * 64,
+            analysis_status=Document.Status.COMPLETED,
+            analysis_result="earlier analysis"
+        )
+        
+        results = self.analyze()
+        
+        self.assertEqual(results[self.first.pk], "earlier analysis")
+        self.assertEqual(results[self.second.pk], "single analysis of second.pdf")
+        self.assertEqual(len(self.calls), 1)
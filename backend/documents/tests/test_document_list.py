@@ -0,0 +1,67 @@
+"""
+Tests for the cached document list
+"""
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase
+from documents.models import Document
+from documents.utils import DatabaseService
+
+
+class DocumentListCacheTests(TestCase):
+    """The cached list never outlives an upload or delete"""
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+    
+    def create_document(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Document.objects.create(filename=name, filepath=f'/tmp/{name}', filesize=1)
+    
+    def listed_ids(self):
+        return [document['id'] for document in DatabaseService.get_all_documents()]
+    
+    def test_list_is_cached_until_invalidated(self):
+        first = self.create_document('a.pdf')
+        self.assertEqual(self.listed_ids(), [first.id])
+        
+        Document.objects.filter(pk=first.pk).update(filename='renamed.pdf')
+        self.assertEqual(DatabaseService.get_all_documents()[0]['filename'], 'a.pdf')
+        
+        second = self.create_document('b.pdf')
+        self.assertEqual(self.listed_ids(), [second.id, first.id])
+    
+    def test_upload_during_fill_is_not_overwritten_by_stale_list(self):
+        first = self.create_document('a.pdf')
+        created = []
+        real_set = cache.set
+        
+        def set_after_concurrent_upload(key, *args, **kwargs):
+            # Another request uploads (and invalidates) after this one has
+            # queried the list but before it stores it
+            if key.startswith('doc:list:v') and not created:
+                created.append(None)
+                created[0] = self.create_document('b.pdf')
+            return real_set(key, *args, **kwargs)
+        
+        with mock.patch('documents.utils.cache.set', side_effect=set_after_concurrent_upload):
+            self.assertEqual(self.listed_ids(), [first.id])
+        
+        self.assertEqual(self.listed_ids(), [created[0].id, first.id])
+    
+    def test_delete_during_fill_is_not_overwritten_by_stale_list(self):
+        first = self.create_document('a.pdf')
+        second = self.create_document('b.pdf')
+        real_set = cache.set
+        
+        def set_after_concurrent_delete(key, *args, **kwargs):
+            if key.startswith('doc:list:v') and Document.objects.filter(pk=second.pk).exists():
+                with self.captureOnCommitCallbacks(execute=True):
+                    Document.objects.filter(pk=second.pk).delete()
+            return real_set(key, *args, **kwargs)
+        
+        with mock.patch('documents.utils.cache.set', side_effect=set_after_concurrent_delete):
+            self.assertEqual(self.listed_ids(), [second.id, first.id])
+        
+        self.assertEqual(self.listed_ids(), [first.id])
@@ -0,0 +1,81 @@
+"""
+Tests for the data migrations that rewrite existing documents
+"""
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Migrate to migrate_from, set up data, then migrate to migrate_to"""
+    
+    migrate_from = None
+    migrate_to = None
+    
+    def setUp(self):
+        self.migrate(self.migrate_from)
+    
+    def tearDown(self):
+        # Leave the schema at the latest migration for the other tests
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        self.migrate(executor.loader.graph.leaf_nodes('documents')[0])
+    
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+
+class AnalysisStatusMigrationTests(MigrationTestCase):
+    """0005 turns status names into integer codes and back"""
+    
+    migrate_from = ('documents', '0004_document_indexes')
+    migrate_to = ('documents', '0005_document_analysis_status_integer')
+    
+    def test_forward_and_back(self):
+        apps = self.migrate(self.migrate_from)
+        Document = apps.get_model('documents', 'Document')
+        names = ['pending', 'processing', 'completed', 'failed']
+        ids = {
+            name: Document.objects.create(filename=f'{name}.pdf', filepath=f'/tmp/{name}.pdf', filesize=1, analysis_status=name).pk
+            for name in names
+        }
+        
+        apps = self.migrate(self.migrate_to)
+        Document = apps.get_model('documents', 'Document')
+        for code, name in enumerate(names):
+            self.assertEqual(Document.objects.get(pk=ids[name]).analysis_status, code)
+        
+        apps = self.migrate(self.migrate_from)
+        Document = apps.get_model('documents', 'Document')
+        for name in names:
+            self.assertEqual(Document.objects.get(pk=ids[name]).analysis_status, name)
+
+
+class AnalysisResultCompressionMigrationTests(MigrationTestCase):
+    """0006 moves analysis results into a compressed column and back"""
+    
+    migrate_from = ('documents', '0005_document_analysis_status_integer')
+    migrate_to = ('documents', '0006_document_analysis_result_compressed')
+    
+    def test_forward_and_back(self):
+        apps = self.migrate(self.migrate_from)
+        Document = apps.get_model('documents', 'Document')
+        result = '**Document Summary**\n- Hemoglobin 13.5 g/dL — normal ✓\n' * 50
+        analyzed = Document.objects.create(filename='a.pdf', filepath='/tmp/a.pdf', filesize=1, analysis_result=result).pk
+        empty = Document.objects.create(filename='b.pdf', filepath='/tmp/b.pdf', filesize=1).pk
+        
+        apps = self.migrate(self.migrate_to)
+        Document = apps.get_model('documents', 'Document')
+        self.assertEqual(Document.objects.get(pk=analyzed).analysis_result, result)
+        self.assertIsNone(Document.objects.get(pk=empty).analysis_result)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT analysis_result FROM documents WHERE id = %s', [analyzed])
+            self.assertLess(len(bytes(cursor.fetchone()[0])), len(result.encode()))
+        
+        apps = self.migrate(self.migrate_from)
+        Document = apps.get_model('documents', 'Document')
+        self.assertEqual(Document.objects.get(pk=analyzed).analysis_result, result)
+        self.assertIsNone(Document.objects.get(pk=empty).analysis_result)
@@ -0,0 +1,116 @@
+"""
+Tests for content-addressed document storage
+"""
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from documents.exceptions import FileStorageError
+from documents.models import Document
+from documents.utils import DatabaseService, DocumentStorageService
+
+PDF_CONTENT = b'%PDF-1.4\n1 0 obj << /Type /Catalog >> endobj\ntrailer << /Root 1 0 R >>\n%%EOF\n'
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Identical uploads share one stored file until the last record is deleted"""
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            FILE_UPLOAD_TEMP_DIR=self.media_root
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        # Text extraction is queued after upload; no broker in tests
+        queue_patch = mock.patch('documents.views._queue_text_extraction')
+        queue_patch.start()
+        self.addCleanup(queue_patch.stop)
+    
+    def upload(self, content=PDF_CONTENT, name='report.pdf'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/documents/upload/',
+                {'file': SimpleUploadedFile(name, content, content_type='application/pdf')}
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        return Document.objects.get(pk=response.json()['id'])
+    
+    def delete(self, document):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/documents/{document.id}/delete/')
+        self.assertEqual(response.status_code, 200, response.content)
+    
+    def test_identical_uploads_share_one_file(self):
+        first = self.upload(name='a.pdf')
+        second = self.upload(name='b.pdf')
+        
+        self.assertEqual(first.filepath, second.filepath)
+        self.assertEqual(first.content_sha256, second.content_sha256)
+        self.assertTrue(first.filepath.startswith(self.media_root))
+        with open(first.filepath, 'rb') as stored:
+            self.assertEqual(stored.read(), PDF_CONTENT)
+    
+    def test_different_uploads_get_separate_files(self):
+        first = self.upload()
+        second = self.upload(content=PDF_CONTENT + b'% other\n')
+        
+        self.assertNotEqual(first.filepath, second.filepath)
+    
+    def test_deleting_one_of_two_records_keeps_the_file(self):
+        first = self.upload(name='a.pdf')
+        second = self.upload(name='b.pdf')
+        
+        self.delete(first)
+        
+        self.assertTrue(os.path.exists(second.filepath))
+        self.assertFalse(Document.objects.filter(pk=first.pk).exists())
+    
+    def test_deleting_the_last_record_removes_the_file(self):
+        first = self.upload(name='a.pdf')
+        second = self.upload(name='b.pdf')
+        
+        self.delete(first)
+        self.delete(second)
+        
+        self.assertFalse(os.path.exists(second.filepath))
+    
+    def test_queryset_delete_keeps_files_still_in_use(self):
+        shared = self.upload(name='a.pdf')
+        self.upload(name='b.pdf')
+        other = self.upload(content=PDF_CONTENT + b'% other\n')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            Document.objects.filter(pk__in=[shared.pk, other.pk]).delete()
+        
+        self.assertTrue(os.path.exists(shared.filepath))
+        self.assertFalse(os.path.exists(other.filepath))
+    
+    def test_delete_with_lock_reports_missing_document(self):
+        self.assertEqual(DatabaseService.delete_with_lock(999999), (False, False))
+    
+    def test_release_file_keeps_file_in_use(self):
+        document = self.upload()
+        
+        self.assertFalse(DocumentStorageService.release_file(document.filepath, document.content_sha256))
+        self.assertTrue(os.path.exists(document.filepath))
+    
+    def test_stored_file_is_the_handler_temporary_file(self):
+        content = PDF_CONTENT + b'%' + b'x' * (3 * 1024 * 1024) + b'\n'
+        document = self.upload(content=content)
+        
+        with open(document.filepath, 'rb') as stored:
+            self.assertEqual(stored.read(), content)
+        self.assertEqual(os.listdir(self.media_root), [document.content_sha256[:2]])
+    
+    def test_uploads_not_hashed_on_receipt_are_refused(self):
+        # Only HashingTemporaryFileUploadHandler output can be placed
+        uploaded_file = SimpleUploadedFile('a.pdf', PDF_CONTENT, content_type='application/pdf')
+        
+        with self.assertRaises(FileStorageError):
+            DocumentStorageService.save_file_with_checksum(uploaded_file)
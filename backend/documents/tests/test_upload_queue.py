@@ -0,0 +1,63 @@
+"""
+Tests for queueing text extraction after uploads
+"""
+import shutil
+import tempfile
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from kombu.exceptions import OperationalError
+from documents.models import Document
+
+PDF_CONTENT = b'%PDF-1.4\n1 0 obj << /Type /Catalog >> endobj\ntrailer << /Root 1 0 R >>\n%%EOF\n'
+
+
+class TextExtractionQueueTests(TestCase):
+    """Extraction is queued once per upload request, after commit, without retries"""
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            FILE_UPLOAD_TEMP_DIR=self.media_root
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        apply_patch = mock.patch('documents.views.extract_document_text_task.apply_async')
+        self.apply_async = apply_patch.start()
+        self.addCleanup(apply_patch.stop)
+    
+    def pdf(self, name, suffix=b''):
+        return SimpleUploadedFile(name, PDF_CONTENT + suffix, content_type='application/pdf')
+    
+    def test_single_upload_queues_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/documents/upload/', {'file': self.pdf('a.pdf')})
+        
+        self.assertEqual(response.status_code, 201, response.content)
+        self.apply_async.assert_not_called()
+        
+        for callback in callbacks:
+            callback()
+        self.apply_async.assert_called_once_with(([response.json()['id']],), retry=False)
+    
+    def test_bulk_upload_queues_one_task(self):
+        files = [self.pdf(f'{i}.pdf', f'% {i}\n'.encode()) for i in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/documents/upload/bulk/', {'files': files})
+        
+        self.assertEqual(response.status_code, 201, response.content)
+        self.apply_async.assert_called_once()
+        ((document_ids,),), _ = self.apply_async.call_args
+        self.assertCountEqual(document_ids, Document.objects.values_list('id', flat=True))
+    
+    def test_broker_errors_do_not_fail_the_upload(self):
+        self.apply_async.side_effect = OperationalError('Connection refused')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/documents/upload/', {'file': self.pdf('a.pdf')})
+        
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(Document.objects.filter(pk=response.json()['id']).exists())
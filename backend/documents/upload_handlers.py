@@ -0,0 +1,28 @@
+"""
+Upload handlers for document management
+"""
+import hashlib
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class HashingTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Stream every upload to a temporary file, hashing it on the way in
+    
+    The finished TemporaryUploadedFile carries a ``sha256`` attribute, so
+    DocumentStorageService can move the temporary file into storage
+    instead of reading it back to copy and hash it.
+    """
+    
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+    
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+    
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        uploaded_file.sha256 = self.digest.hexdigest()
+        return uploaded_file
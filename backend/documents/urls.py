@@ -3,10 +3,13 @@ from . import views
 
 urlpatterns = [
     path('upload/', views.upload_document, name='upload_document'),
+    path('upload/bulk/', views.upload_documents_bulk, name='upload_documents_bulk'),
     path('', views.list_documents, name='list_documents'),
     path('<int:document_id>/', views.download_document, name='download_document'),
     path('<int:document_id>/delete/', views.delete_document, name='delete_document'),
     path('<int:document_id>/analyze/', views.analyze_document, name='analyze_document'),
+    path('analyze/bulk/', views.analyze_documents_bulk, name='analyze_documents_bulk'),
     path('<int:document_id>/analysis/', views.get_document_analysis, name='get_document_analysis'),
+    path('analysis/status/<str:task_id>/', views.get_analysis_task_status, name='analysis_task_status'),
     path('health/', views.health_check, name='document_health_check'),
 ]
\ No newline at end of file
@@ -3,47 +3,211 @@ Utility functions for document management
 """
 import os
 import uuid
+import logging
+from datetime import timedelta
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
+from django.core.files.move import file_move_safe
+from django.http import FileResponse, HttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from urllib.parse import quote
+from .models import Document
+from .exceptions import FileStorageError
+
+logger = logging.getLogger(__name__)
+
+# Read size when FileResponse has to stream a file itself (no
+# wsgi.file_wrapper); Django's 4 KiB default means many small reads
+DOWNLOAD_BLOCK_SIZE = 1024 * 1024
+
+# MEDIA_ROOT that has already been created by this process
+_media_root_ready = None
+
+
+def _ensure_media_root(force=False):
+    """
+    Create MEDIA_ROOT the first time it is needed
+    
+    The directory is only created again if MEDIA_ROOT changes (e.g. under
+    override_settings) or when force is set.
+    
+    Returns:
+        str: The current MEDIA_ROOT
+    """
+    global _media_root_ready
+    media_root = settings.MEDIA_ROOT
+    if force or media_root != _media_root_ready:
+        os.makedirs(media_root, exist_ok=True)
+        _media_root_ready = media_root
+    return media_root
 
 
 class DocumentStorageService:
     """Service for handling document file operations"""
     
     @staticmethod
-    def generate_unique_filename(original_filename):
-        """Generate a unique filename with UUID prefix"""
-        file_extension = os.path.splitext(original_filename)[1]
-        unique_name = f"{uuid.uuid4()}{file_extension}"
-        return unique_name
+    def content_path(content_sha256, original_filename=''):
+        """
+        Storage path of a file with the given content
+        
+        Files are named by their SHA-256 and sharded on its first two hex
+        digits (MEDIA_ROOT/ab/ab12....pdf), so identical uploads share a
+        single stored file.
+        
+        Args:
+            content_sha256: Hex SHA-256 of the file content
+            original_filename: Uploaded name, for the file extension
+            
+        Returns:
+            str: Full path for the file
+        """
+        dot = original_filename.rfind('.')
+        file_extension = original_filename[dot:].lower() if dot > 0 else ''
+        return os.path.join(_ensure_media_root(), content_sha256[:2], f"{content_sha256}{file_extension}")
     
     @staticmethod
-    def save_file(uploaded_file):
+    def save_file_with_checksum(uploaded_file):
         """
-        Save uploaded file to storage and return file path
+        Save uploaded file to content-addressed storage
+        
+        The content was hashed as it was received; if a file with the same
+        content is already stored, that file is reused and nothing is kept.
+        
+        Call this inside the transaction that creates the document record:
+        the content lock taken here is held until that record commits, so a
+        concurrent delete of the last document with the same content cannot
+        unlink the file in between (see DatabaseService.lock_content).
         
         Args:
             uploaded_file: Django UploadedFile object
             
         Returns:
-            str: Full path to saved file
+            tuple: (full path to stored file, hex SHA-256 of its content)
+        """
+        content_sha256 = DocumentStorageService.stage_file(uploaded_file)
+        return DocumentStorageService.place_staged(uploaded_file, content_sha256)
+    
+    @staticmethod
+    def stage_file(uploaded_file):
+        """
+        Hash of an upload that is ready to be placed in storage
+        
+        Uploads are written to a temporary file and hashed on the way in by
+        HashingTemporaryFileUploadHandler (the only entry in
+        FILE_UPLOAD_HANDLERS), so nothing is read or written here. Staging
+        needs no database access and can run in worker threads; place_staged
+        then moves the file to its storage path.
+        
+        Args:
+            uploaded_file: Django UploadedFile object
+            
+        Returns:
+            str: Hex SHA-256 of the content
+            
+        Raises:
+            FileStorageError: If the upload did not go through the hashing handler
+        """
+        content_sha256 = getattr(uploaded_file, 'sha256', None)
+        if not content_sha256 or not hasattr(uploaded_file, 'temporary_file_path'):
+            raise FileStorageError(
+                "Upload was not hashed on receipt (FILE_UPLOAD_HANDLERS must use "
+                "HashingTemporaryFileUploadHandler)"
+            )
+        return content_sha256
+    
+    @staticmethod
+    def place_staged(uploaded_file, content_sha256):
+        """
+        Move a staged upload to its content path
+        
+        Must run inside the transaction that creates the document record,
+        for the same reason as save_file_with_checksum. If the content is
+        already stored, the temporary file is left for Django to remove.
+        
+        Args:
+            uploaded_file: Django UploadedFile object that was staged
+            content_sha256: Result of stage_file for it
+            
+        Returns:
+            tuple: (full path to stored file, hex SHA-256 of its content)
+        """
+        file_path = DocumentStorageService.content_path(content_sha256, uploaded_file.name)
+        DatabaseService.lock_content(content_sha256)
+        
+        if not os.path.exists(file_path):
+            DocumentStorageService._move_into_storage(uploaded_file.temporary_file_path(), file_path)
+        return file_path, content_sha256
+    
+    @staticmethod
+    def _move_into_storage(temporary_path, file_path):
+        """Move a temporary upload to its storage path (a rename on one filesystem)"""
+        try:
+            file_move_safe(temporary_path, file_path)
+        except FileNotFoundError:
+            # First file in this shard, or the uploads directory was removed
+            # while the process was running
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            _ensure_media_root(force=True)
+            try:
+                file_move_safe(temporary_path, file_path)
+            except FileExistsError:
+                return  # Stored concurrently by an identical upload
+        except FileExistsError:
+            return  # Stored concurrently by an identical upload
+        
+        # Temporary files are private (0600); stored files get the usual mode
+        if settings.FILE_UPLOAD_PERMISSIONS is not None:
+            os.chmod(file_path, settings.FILE_UPLOAD_PERMISSIONS)
+    
+    @staticmethod
+    def open_stream(file_path, filename=None, content_type='application/pdf'):
         """
-        # Generate unique filename
-        unique_filename = DocumentStorageService.generate_unique_filename(uploaded_file.name)
+        Open a stored file as a streaming response
+        
+        FileResponse hands the open file to the server's wsgi.file_wrapper
+        when there is one (gunicorn, uWSGI), which sends it with sendfile(2)
+        instead of copying it through Python in small blocks.
         
-        # Full path where file will be stored
-        file_path = os.path.join(settings.MEDIA_ROOT, unique_filename)
+        Content-Length comes from the open file and, with a filename, an
+        inline Content-Disposition (with RFC 5987 encoding for non-ASCII
+        names) is set by FileResponse.
         
-        # Ensure uploads directory exists
-        os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+        With USE_NGINX_ACCEL, files under MEDIA_ROOT are not opened at all:
+        an empty response with X-Accel-Redirect tells nginx to send the file.
         
-        # Save file to disk
-        with open(file_path, 'wb+') as destination:
-            for chunk in uploaded_file.chunks():
-                destination.write(chunk)
+        Args:
+            file_path: Full path to file
+            filename: Name to present the file under
+            content_type: Content-Type of the response
+            
+        Returns:
+            HttpResponse: FileResponse streaming the file, or an X-Accel-Redirect response
+            
+        Raises:
+            OSError: If the file cannot be opened
+        """
+        if settings.USE_NGINX_ACCEL:
+            relative_path = os.path.relpath(file_path, settings.MEDIA_ROOT)
+            if not relative_path.startswith(os.pardir):
+                response = HttpResponse(content_type=content_type)
+                response['X-Accel-Redirect'] = settings.NGINX_ACCEL_PREFIX + quote(relative_path)
+                if filename:
+                    response['Content-Disposition'] = content_disposition_header(False, filename)
+                return response
         
-        return file_path
+        response = FileResponse(
+            open(file_path, 'rb'),
+            as_attachment=False,
+            filename=filename,
+            content_type=content_type
+        )
+        response.block_size = DOWNLOAD_BLOCK_SIZE
+        return response
     
     @staticmethod
     def delete_file(file_path):
@@ -56,13 +220,37 @@ class DocumentStorageService:
         Returns:
             bool: True if file was deleted, False if file didn't exist
         """
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                return True
-            except OSError:
+        try:
+            os.remove(file_path)
+            return True
+        except OSError:
+            return False
+    
+    @staticmethod
+    def release_file(file_path, content_sha256=None):
+        """
+        Delete a stored file unless a document record still uses it
+        
+        Files are shared by documents with the same content, so cleanup
+        after a failed upload must not remove one that is in use.
+        
+        Args:
+            file_path: Full path to file
+            content_sha256: Hex SHA-256 of the file content
+            
+        Returns:
+            bool: True if file was deleted
+        """
+        if not content_sha256:
+            return DocumentStorageService.delete_file(file_path)
+        
+        # Checked and unlinked under the content lock, so an upload of the
+        # same content cannot start using the file in between
+        with transaction.atomic():
+            DatabaseService.lock_content(content_sha256)
+            if Document.objects.filter(content_sha256=content_sha256, filepath=file_path).exists():
                 return False
-        return False
+            return DocumentStorageService.delete_file(file_path)
     
     @staticmethod
     def file_exists(file_path):
@@ -78,26 +266,42 @@ class DocumentStorageService:
         return os.path.exists(file_path)
     
     @staticmethod
-    def get_file_size(file_path):
+    def get_file_stat(file_path):
         """
-        Get file size in bytes
+        Get the stat result of a stored file
         
         Args:
             file_path: Full path to file
             
         Returns:
-            int: File size in bytes, 0 if file doesn't exist
+            os.stat_result: File status, or None if the file doesn't exist
         """
-        if os.path.exists(file_path):
-            return os.path.getsize(file_path)
-        return 0
+        try:
+            return os.stat(file_path)
+        except OSError:
+            return None
 
 
 class DatabaseService:
     """Service for database operations"""
     
+    # Columns of the cached document list (what DocumentSerializer renders);
+    # bump the key versions below when they change
+    DOCUMENT_LIST_FIELDS = ('id', 'filename', 'filesize', 'created_at', 'analysis_status', 'analyzed_at')
+    
+    # The full list and its pages are cached under a generation token that
+    # changes on every invalidation. A list read before an invalidation is
+    # stored under the old token, where it is never read again, instead of
+    # overwriting the fresh one; old entries simply expire
+    DOCUMENT_PAGE_GENERATION_KEY = 'doc:list:gen'
+    DOCUMENT_PAGE_CACHE_TTL = 60
+    
+    # Cached document count (health check); short TTL as a safety net
+    DOCUMENT_COUNT_CACHE_KEY = 'doc:count:v1'
+    DOCUMENT_COUNT_CACHE_TTL = 30
+    
     @staticmethod
-    def create_document_record(filename, filepath, filesize):
+    def create_document_record(filename, filepath, filesize, content_sha256=None):
         """
         Create a new document record in database
         
@@ -105,62 +309,310 @@ class DatabaseService:
             filename: Original filename
             filepath: Path to stored file
             filesize: File size in bytes
+            content_sha256: Hex SHA-256 of the file content
             
         Returns:
             Document: Created document instance
         """
-        from .models import Document
-        
         document = Document.objects.create(
             filename=filename,
             filepath=filepath,
-            filesize=filesize
+            filesize=filesize,
+            content_sha256=content_sha256
         )
         return document
     
+    @staticmethod
+    def lock_content(content_sha256):
+        """
+        Lock a content digest until the current transaction ends
+        
+        Uploads hold the lock from checking whether the content is already
+        stored until their record commits; removing a stored file takes it
+        around the check that no record uses the file. This keeps a file
+        from being unlinked just after an upload decided to reuse it.
+        
+        Uses a PostgreSQL transaction-level advisory lock; other databases
+        (SQLite in local development) are not locked.
+        
+        Args:
+            content_sha256: Hex SHA-256 of the file content
+        """
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            # First 60 bits of the digest as the (bigint) lock key
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [int(content_sha256[:15], 16)])
+    
+    @staticmethod
+    def bulk_create_documents(records):
+        """
+        Create several document records in one transaction
+        
+        Args:
+            records: Dicts of Document field values
+            
+        Returns:
+            list: Created document instances
+        """
+        with transaction.atomic():
+            documents = Document.objects.bulk_create(
+                [Document(**record) for record in records],
+                batch_size=500
+            )
+        # bulk_create sends no post_save
+        transaction.on_commit(DatabaseService.invalidate_document_list)
+        return documents
+    
+    @staticmethod
+    def _list_generation():
+        """Current document list generation token (read before querying, see DOCUMENT_PAGE_GENERATION_KEY)"""
+        generation = cache.get(DatabaseService.DOCUMENT_PAGE_GENERATION_KEY)
+        if generation is None:
+            cache.add(DatabaseService.DOCUMENT_PAGE_GENERATION_KEY, uuid.uuid4().hex, None)
+            generation = cache.get(DatabaseService.DOCUMENT_PAGE_GENERATION_KEY)
+        return generation
+    
     @staticmethod
     def get_all_documents():
         """
         Get all documents ordered by creation date (newest first)
         
+        The list is served from the cache until a document is added,
+        deleted or changes status (see invalidate_document_list).
+        
         Returns:
-            QuerySet: All document records
+            list: Dicts with the DOCUMENT_LIST_FIELDS of every document
         """
-        from .models import Document
-        return Document.objects.all()
+        try:
+            cache_key = f"doc:list:v2:{DatabaseService._list_generation()}"
+            documents = cache.get(cache_key)
+        except Exception as e:
+            logger.warning(f"Document list cache read failed: {e}")
+            cache_key = None
+            documents = None
+        
+        if documents is None:
+            # Explicit newest-first order, served by documents_created_id_idx
+            documents = list(
+                Document.objects
+                .order_by('-created_at', '-id')
+                .values(*DatabaseService.DOCUMENT_LIST_FIELDS)
+            )
+            if cache_key:
+                try:
+                    cache.set(cache_key, documents, settings.DOCUMENT_LIST_CACHE_TTL)
+                except Exception as e:
+                    logger.warning(f"Document list cache write failed: {e}")
+        
+        return documents
     
     @staticmethod
-    def get_document_by_id(document_id):
+    def get_documents_page(limit, offset=0, after=None):
+        """
+        Get one page of documents ordered by creation date (newest first)
+        
+        Pages are either skipped to by offset or, with after, continue
+        below the last document of the previous page (keyset pagination,
+        which reads only the page from documents_created_id_idx however
+        deep it is).
+        
+        Args:
+            limit: Maximum number of documents to return
+            offset: Number of documents to skip
+            after: (created_at, id) of the last document already returned
+            
+        Returns:
+            list: Dicts with the DOCUMENT_LIST_FIELDS of the page's documents
+        """
+        position = f"{after[0].isoformat()},{after[1]}" if after else offset
+        try:
+            cache_key = f"doc:page:v2:{DatabaseService._list_generation()}:{limit}:{position}"
+            documents = cache.get(cache_key)
+        except Exception as e:
+            logger.warning(f"Document page cache read failed: {e}")
+            cache_key = None
+            documents = None
+        
+        if documents is None:
+            queryset = Document.objects.order_by('-created_at', '-id')
+            if after:
+                created_at, document_id = after
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=document_id)
+                )
+            else:
+                queryset = queryset[offset:]
+            documents = list(queryset.values(*DatabaseService.DOCUMENT_LIST_FIELDS)[:limit])
+            if cache_key:
+                try:
+                    cache.set(cache_key, documents, DatabaseService.DOCUMENT_PAGE_CACHE_TTL)
+                except Exception as e:
+                    logger.warning(f"Document page cache write failed: {e}")
+        
+        return documents
+    
+    @staticmethod
+    def get_document_count():
+        """
+        Get the number of documents, cached for DOCUMENT_COUNT_CACHE_TTL
+        
+        Returns:
+            int: Number of document records
+        """
+        try:
+            count = cache.get(DatabaseService.DOCUMENT_COUNT_CACHE_KEY)
+        except Exception as e:
+            logger.warning(f"Document count cache read failed: {e}")
+            count = None
+        
+        if count is None:
+            count = Document.objects.count()
+            try:
+                cache.set(DatabaseService.DOCUMENT_COUNT_CACHE_KEY, count, DatabaseService.DOCUMENT_COUNT_CACHE_TTL)
+            except Exception as e:
+                logger.warning(f"Document count cache write failed: {e}")
+        
+        return count
+    
+    @staticmethod
+    def invalidate_document_list():
+        """Drop the cached document list, pages and count after documents change"""
+        try:
+            cache.delete(DatabaseService.DOCUMENT_COUNT_CACHE_KEY)
+            cache.set(DatabaseService.DOCUMENT_PAGE_GENERATION_KEY, uuid.uuid4().hex, None)
+        except Exception as e:
+            logger.warning(f"Document list cache invalidation failed: {e}")
+    
+    @staticmethod
+    def claim_for_analysis(document_id):
+        """
+        Mark a document as being analyzed unless it already is
+        
+        The conditional UPDATE is atomic in the database, so of several
+        concurrent requests for the same document exactly one claims it.
+        A claim older than ANALYSIS_CLAIM_TIMEOUT is treated as abandoned
+        (e.g. its task was lost or the worker killed) and can be taken over.
+        
+        Args:
+            document_id: Document ID
+            
+        Returns:
+            bool: True if this call claimed the document
+        """
+        now = timezone.now()
+        stale_before = now - timedelta(seconds=settings.ANALYSIS_CLAIM_TIMEOUT)
+        claimed = (
+            Document.objects
+            .filter(pk=document_id)
+            .filter(
+                ~Q(analysis_status=Document.Status.PROCESSING)
+                | Q(analysis_claimed_at__isnull=True)
+                | Q(analysis_claimed_at__lt=stale_before)
+            )
+            .update(analysis_status=Document.Status.PROCESSING, analysis_claimed_at=now)
+        )
+        if claimed:
+            # update() sends no post_save
+            DatabaseService.invalidate_document_list()
+        return claimed > 0
+    
+    @staticmethod
+    def get_analysis_statuses(document_ids):
+        """
+        Get the analysis status of several documents
+        
+        Args:
+            document_ids: Document IDs
+            
+        Returns:
+            dict: Analysis status per ID, for the documents that exist
+        """
+        return dict(
+            Document.objects
+            .filter(pk__in=document_ids)
+            .values_list('id', 'analysis_status')
+        )
+    
+    @staticmethod
+    def release_analysis_claim(document_id, analysis_status):
+        """
+        Undo claim_for_analysis when the analysis could not be queued
+        
+        Args:
+            document_id: Document ID
+            analysis_status: Status the document had before it was claimed
+        """
+        Document.objects.filter(
+            pk=document_id,
+            analysis_status=Document.Status.PROCESSING
+        ).update(analysis_status=analysis_status)
+        DatabaseService.invalidate_document_list()
+    
+    @staticmethod
+    def mark_analysis_failed(document_id, error):
+        """
+        Record that a document's analysis has failed for good
+        
+        Args:
+            document_id: Document ID
+            error: Exception (or message) describing the failure
+        """
+        Document.objects.filter(pk=document_id).update(
+            analysis_status=Document.Status.FAILED,
+            analysis_result=f"Analysis failed: {str(error)}"
+        )
+        DatabaseService.invalidate_document_list()
+        logger.error(f"Document analysis failed for {document_id}: {error}")
+    
+    @staticmethod
+    def get_document_by_id(document_id, fields=None):
         """
         Get document by ID
         
         Args:
             document_id: Document ID
+            fields: Columns to load (the id is always loaded); None loads
+                the whole row, including the compressed text columns
             
         Returns:
             Document: Document instance or None if not found
         """
-        from .models import Document
-        try:
-            return Document.objects.get(id=document_id)
-        except Document.DoesNotExist:
-            return None
+        queryset = Document.objects.filter(id=document_id)
+        if fields is not None:
+            queryset = queryset.only(*fields)
+        return queryset.first()
     
     @staticmethod
-    def delete_document_record(document_id):
+    def delete_with_lock(document_id):
         """
-        Delete document record from database
+        Delete a document and its stored file
+        
+        The row is fetched with SELECT ... FOR UPDATE and deleted in one
+        transaction, so concurrent deletes of the same document serialize
+        and only one of them succeeds. The file is unlinked only after the
+        delete has committed.
         
         Args:
             document_id: Document ID to delete
             
         Returns:
-            bool: True if deleted, False if not found
+            tuple: (record deleted, file was present in storage);
+                (False, False) if the document does not exist
         """
-        from .models import Document
-        try:
-            document = Document.objects.get(id=document_id)
+        with transaction.atomic():
+            document = (
+                Document.objects
+                .select_for_update()
+                .only('id', 'filepath', 'content_sha256')
+                .filter(pk=document_id)
+                .first()
+            )
+            if document is None:
+                return False, False
+            
+            file_present = DocumentStorageService.file_exists(document.filepath)
+            # Document.delete() unlinks the file via transaction.on_commit
             document.delete()
-            return True
-        except Document.DoesNotExist:
-            return False
\ No newline at end of file
+        
+        return True, file_present
@@ -1,25 +1,62 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, parser_classes
-from rest_framework.parsers import MultiPartParser, FileUploadParser
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from django.http import FileResponse, Http404, HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views.decorators.gzip import gzip_page
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, urlsafe_base64_encode, urlsafe_base64_decode
 from django.conf import settings
+from django.db import transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from celery.result import AsyncResult
 from .models import Document
-from .serializers import DocumentSerializer, DocumentUploadSerializer, DocumentDetailSerializer
+from .renderers import ORJSONRenderer
+from .serializers import DocumentSerializer, DocumentUploadSerializer, DocumentDetailSerializer, document_list_rows
 from .utils import DocumentStorageService, DatabaseService
 from .validators import InputValidator, DocumentValidator
 from .exceptions import FileStorageError, FileValidationError, DocumentNotFoundError
+from .tasks import analyze_document_task, analyze_documents_batch_task, extract_document_text_task
+from .ai_analyzer import get_analyzer
 import os
 import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on files per bulk upload request, and on parallel writes
+MAX_BULK_UPLOAD_FILES = 20
+BULK_UPLOAD_WORKERS = 8
+
+# Upper bound on documents per bulk analyze request; they are analyzed by
+# one task that packs them into as few Mistral requests as possible
+MAX_BULK_ANALYZE_DOCUMENTS = 20
+
+# Largest page list_documents serves when paginating, and documents
+# encoded per chunk when streaming the full list
+MAX_LIST_PAGE_SIZE = 100
+LIST_STREAM_BATCH_SIZE = 500
+
+# Downloads may be reused by the browser (not shared caches) for an hour,
+# then revalidated with If-None-Match / If-Modified-Since
+DOWNLOAD_CACHE_CONTROL = 'private, max-age=3600'
+
+# Columns each single-document view loads; the compressed analysis and
+# extracted text are only read by the view that returns them
+DOWNLOAD_DOCUMENT_FIELDS = ('filepath', 'filename', 'content_sha256')
+ANALYZE_DOCUMENT_FIELDS = ('filepath', 'analysis_status')
+ANALYSIS_RESULT_FIELDS = ('analysis_result', 'analysis_status', 'analyzed_at')
+
+# Health check results are reused for this many seconds
+HEALTH_CACHE_KEY = 'health:v1'
+HEALTH_CACHE_TTL = 5
+
 
 @api_view(['POST'])
-@parser_classes([MultiPartParser, FileUploadParser])
+@parser_classes([MultiPartParser])
 def upload_document(request):
     """
     Upload a PDF document
@@ -49,34 +86,42 @@ def upload_document(request):
             # Sanitize filename
             safe_filename = InputValidator.sanitize_filename(uploaded_file.name)
             
-            # Save file using storage service
-            file_path = DocumentStorageService.save_file(uploaded_file)
-            
-            # Verify file was saved correctly
-            if not DocumentStorageService.file_exists(file_path):
-                logger.error(f"File verification failed after save: {file_path}")
-                raise FileStorageError("Failed to save file to storage")
-            
-            # Optional: Validate file content
-            try:
-                DocumentValidator.validate_file_content(file_path)
-            except FileValidationError as e:
-                logger.warning(f"File content validation failed: {e}")
-                # Clean up invalid file
-                DocumentStorageService.delete_file(file_path)
-                return Response(
-                    {'error': str(e)}, 
-                    status=status.HTTP_400_BAD_REQUEST
+            # The file is stored and its record created in one transaction;
+            # the content lock taken while storing is held until the record
+            # commits (see DocumentStorageService.save_file_with_checksum)
+            with transaction.atomic():
+                # Save file using storage service
+                file_path, content_sha256 = DocumentStorageService.save_file_with_checksum(uploaded_file)
+                
+                # Verify file was saved correctly
+                if not DocumentStorageService.file_exists(file_path):
+                    logger.error(f"File verification failed after save: {file_path}")
+                    raise FileStorageError("Failed to save file to storage")
+                
+                # Optional: Deep content validation (the PDF header was already
+                # checked by the serializer before the file was written)
+                if settings.DOCUMENT_DEEP_CONTENT_VALIDATION:
+                    try:
+                        DocumentValidator.validate_file_content(file_path)
+                    except FileValidationError as e:
+                        logger.warning(f"File content validation failed: {e}")
+                        # Clean up invalid file
+                        DocumentStorageService.release_file(file_path, content_sha256)
+                        return Response(
+                            {'error': str(e)}, 
+                            status=status.HTTP_400_BAD_REQUEST
+                        )
+                
+                # Create database record using database service
+                document = DatabaseService.create_document_record(
+                    filename=safe_filename,
+                    filepath=file_path,
+                    filesize=uploaded_file.size,
+                    content_sha256=content_sha256
                 )
             
-            # Create database record using database service
-            document = DatabaseService.create_document_record(
-                filename=safe_filename,
-                filepath=file_path,
-                filesize=uploaded_file.size
-            )
-            
             logger.info(f"Document uploaded successfully: ID {document.id}")
+            _queue_text_extraction([document.id])
             return Response(
                 {
                     **DocumentSerializer(document).data,
@@ -93,9 +138,10 @@ def upload_document(request):
             )
         except Exception as e:
             logger.error(f"Unexpected error during upload: {e}")
-            # Clean up file if database record creation fails
-            if 'file_path' in locals() and DocumentStorageService.file_exists(file_path):
-                DocumentStorageService.delete_file(file_path)
+            # Clean up file if database record creation fails (release_file
+            # tolerates a file that is already gone)
+            if 'file_path' in locals():
+                DocumentStorageService.release_file(file_path, content_sha256)
             
             return Response(
                 {'error': f'Failed to save file: {str(e)}'}, 
@@ -107,6 +153,192 @@ def upload_document(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _queue_text_extraction(document_ids):
+    """
+    Queue PDF text extraction for new documents once they are committed
+    
+    The extraction is optional (analysis extracts the text itself if this
+    never runs), so the message is sent once without the publish retries
+    and broker errors are only logged: the upload succeeds regardless.
+    """
+    def send():
+        try:
+            extract_document_text_task.apply_async((document_ids,), retry=False)
+        except Exception as e:
+            logger.warning(f"Could not queue text extraction for documents {document_ids}: {e}")
+    
+    transaction.on_commit(send)
+
+
+def _stage_upload(uploaded_file):
+    """
+    Validate one file of a bulk upload and stage it for storage
+    
+    Args:
+        uploaded_file: Django UploadedFile object
+        
+    Returns:
+        str: Hex SHA-256 of the content (see DocumentStorageService.stage_file)
+        
+    Raises:
+        FileValidationError: If the file is rejected
+    """
+    serializer = DocumentUploadSerializer(data={'file': uploaded_file})
+    if not serializer.is_valid():
+        raise FileValidationError('; '.join(
+            str(error) for field_errors in serializer.errors.values() for error in field_errors
+        ))
+    
+    return DocumentStorageService.stage_file(uploaded_file)
+
+
+def _upload_record(uploaded_file, file_path, content_sha256):
+    """
+    Check one stored file of a bulk upload and build its record
+    
+    Args:
+        uploaded_file: Django UploadedFile object
+        file_path: Path the file was stored at
+        content_sha256: Hex SHA-256 of its content
+        
+    Returns:
+        dict: Field values for the Document record
+        
+    Raises:
+        FileValidationError: If deep content validation rejects the file
+    """
+    if settings.DOCUMENT_DEEP_CONTENT_VALIDATION:
+        DocumentValidator.validate_file_content(file_path)
+    
+    return {
+        'filename': InputValidator.sanitize_filename(uploaded_file.name),
+        'filepath': file_path,
+        'filesize': uploaded_file.size,
+        'content_sha256': content_sha256,
+    }
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser])
+def upload_documents_bulk(request):
+    """
+    Upload several PDF documents in one request
+    
+    Files (multipart field 'files') are validated in parallel, then moved
+    into storage and their records created in a single transaction.
+    Rejected files are reported without failing the others.
+    """
+    files = request.FILES.getlist('files')
+    logger.info(f"Bulk upload request received with {len(files)} files")
+    
+    if not files:
+        return Response(
+            {'error': 'No files provided'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(files) > MAX_BULK_UPLOAD_FILES:
+        return Response(
+            {'error': f'Too many files (maximum {MAX_BULK_UPLOAD_FILES} per request)'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    def stage(uploaded_file):
+        try:
+            return _stage_upload(uploaded_file), None
+        except Exception as e:
+            if not isinstance(e, FileValidationError):
+                logger.error(f"Bulk upload failed to stage {uploaded_file.name}: {e}")
+            return None, {'filename': uploaded_file.name, 'error': str(e)}
+    
+    with ThreadPoolExecutor(max_workers=min(BULK_UPLOAD_WORKERS, len(files))) as executor:
+        results = list(executor.map(stage, files))
+    
+    errors = [error for _, error in results if error is not None]
+    # Stored in digest order, the order their content locks must be taken in
+    staged_files = sorted(
+        [(uploaded_file, staged) for uploaded_file, (staged, _) in zip(files, results) if staged is not None],
+        key=lambda item: item[1]
+    )
+    
+    records = []
+    try:
+        with transaction.atomic():
+            for uploaded_file, staged in staged_files:
+                stored = None
+                try:
+                    # A savepoint per file, so a database error only fails that file
+                    with transaction.atomic():
+                        stored = DocumentStorageService.place_staged(uploaded_file, staged)
+                        records.append(_upload_record(uploaded_file, *stored))
+                except Exception as e:
+                    if not isinstance(e, FileValidationError):
+                        logger.error(f"Bulk upload failed to store {uploaded_file.name}: {e}")
+                    errors.append({'filename': uploaded_file.name, 'error': str(e)})
+                    # Remove the file unless an earlier file of this upload
+                    # has the same content and still needs it
+                    if stored and not any(record['filepath'] == stored[0] for record in records):
+                        DocumentStorageService.release_file(*stored)
+            documents = DatabaseService.bulk_create_documents(records)
+    except Exception as e:
+        logger.error(f"Bulk upload failed to create records: {e}")
+        # Clean up stored files no other record points at
+        for record in records:
+            DocumentStorageService.release_file(record['filepath'], record['content_sha256'])
+        return Response(
+            {'error': f'Failed to save files: {str(e)}'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    
+    logger.info(f"Bulk upload stored {len(documents)} documents, rejected {len(errors)}")
+    _queue_text_extraction([document.id for document in documents])
+    return Response(
+        {
+            'documents': DocumentSerializer(documents, many=True).data,
+            'errors': errors,
+        },
+        status=status.HTTP_201_CREATED if documents else status.HTTP_400_BAD_REQUEST
+    )
+
+
+# Encodes the chunks of the streamed document list like API responses
+_JSON_RENDERER = ORJSONRenderer()
+
+
+def _encode_cursor(document):
+    """Opaque list cursor for the position after a document row"""
+    position = f"{document['created_at'].isoformat()},{document['id']}"
+    return urlsafe_base64_encode(position.encode())
+
+
+def _decode_cursor(cursor):
+    """
+    Decode a list cursor made by _encode_cursor
+    
+    Returns:
+        tuple: (created_at, id) of the last document of the previous page
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    created_at, document_id = urlsafe_base64_decode(cursor).decode().rsplit(',', 1)
+    created_at = datetime.fromisoformat(created_at)
+    if created_at.tzinfo is None:
+        raise ValueError("Cursor timestamp has no timezone")
+    return created_at, int(document_id)
+
+
+def _stream_document_list(documents):
+    """Yield the full list response body ({"documents": [...], "count": N}) in batches"""
+    yield b'{"documents":['
+    for start in range(0, len(documents), LIST_STREAM_BATCH_SIZE):
+        batch = document_list_rows(documents[start:start + LIST_STREAM_BATCH_SIZE])
+        # One encode per batch; strip the list brackets to splice it in
+        encoded = _JSON_RENDERER.render(batch)[1:-1]
+        yield b',' + encoded if start else encoded
+    yield b'],"count":%d}' % len(documents)
+
+
+@gzip_page
 @api_view(['GET'])
 def list_documents(request):
     """
@@ -115,16 +347,70 @@ def list_documents(request):
     Query database for all document metadata and return JSON array 
     of document information ordered by creation date (newest first).
     
+    Pass ?limit=N to get one page instead; 'count' is then the total
+    number of documents. Follow 'next_cursor' (&cursor=...) to the next
+    page, or skip with &offset=M.
+    
     Requirements: 2.1, 6.2
     """
+    if 'limit' in request.query_params:
+        try:
+            limit = int(request.query_params['limit'])
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return Response(
+                {'error': 'limit and offset must be integers'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= limit <= MAX_LIST_PAGE_SIZE or offset < 0:
+            return Response(
+                {'error': f'limit must be between 1 and {MAX_LIST_PAGE_SIZE} and offset must not be negative'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        after = None
+        if 'cursor' in request.query_params:
+            try:
+                after = _decode_cursor(request.query_params['cursor'])
+            except ValueError:
+                return Response(
+                    {'error': 'Invalid cursor'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if offset:
+                return Response(
+                    {'error': 'cursor and offset cannot be combined'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+    else:
+        limit = None
+    
     try:
-        documents = DatabaseService.get_all_documents()
-        serializer = DocumentSerializer(documents, many=True)
+        if limit is None:
+            # Full list: encode and send it in batches instead of building
+            # the whole JSON document first
+            documents = DatabaseService.get_all_documents()
+            return StreamingHttpResponse(
+                _stream_document_list(documents),
+                content_type='application/json'
+            )
+        
+        # One extra row tells whether there is a next page
+        documents = DatabaseService.get_documents_page(limit + 1, offset, after)
+        has_more = len(documents) > limit
+        documents = documents[:limit]
+        
+        data = {
+            'documents': document_list_rows(documents),
+            'count': DatabaseService.get_document_count(),
+            'limit': limit,
+            'next_cursor': _encode_cursor(documents[-1]) if has_more else None
+        }
+        if after is None:
+            data['offset'] = offset
+            data['next_offset'] = offset + limit if has_more else None
         
-        return Response({
-            'documents': serializer.data,
-            'count': len(serializer.data)
-        })
+        return Response(data)
         
     except Exception as e:
         return Response(
@@ -133,7 +419,7 @@ def list_documents(request):
         )
 
 
-@api_view(['GET', 'OPTIONS'])
+@api_view(['GET'])
 def download_document(request, document_id):
     """
     Download a specific document
@@ -142,14 +428,9 @@ def download_document(request, document_id):
     Handle missing file scenarios gracefully.
     
     Requirements: 3.1, 3.2, 6.3
+    
+    CORS (including preflight requests) is handled by CorsMiddleware.
     """
-    # Handle CORS preflight requests
-    if request.method == 'OPTIONS':
-        response = HttpResponse()
-        response['Access-Control-Allow-Origin'] = 'http://localhost:3000'
-        response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-        return response
     # Validate document_id using InputValidator
     try:
         document_id = InputValidator.validate_document_id(document_id)
@@ -161,37 +442,39 @@ def download_document(request, document_id):
             content_type='text/plain'
         )
     
-    # Get document from database
-    document = DatabaseService.get_document_by_id(document_id)
+    # Get document from database (just what the response needs)
+    document = DatabaseService.get_document_by_id(document_id, fields=DOWNLOAD_DOCUMENT_FIELDS)
     if not document:
         raise Http404("Document not found")
     
     # Check if file exists on disk
-    if not DocumentStorageService.file_exists(document.filepath):
+    file_stat = DocumentStorageService.get_file_stat(document.filepath)
+    if file_stat is None:
         raise Http404("File not found on disk")
     
+    # A document's content never changes, so its SHA-256 is a strong
+    # validator; older records without one fall back to size and mtime
+    if document.content_sha256:
+        etag = f'"{document.content_sha256}"'
+    else:
+        etag = f'W/"{file_stat.st_size:x}-{int(file_stat.st_mtime):x}"'
+    last_modified = int(file_stat.st_mtime)
+    
     try:
-        # Serve file with proper headers for inline viewing
-        response = FileResponse(
-            open(document.filepath, 'rb'),
-            content_type='application/pdf'
-        )
+        # 304 Not Modified when the client's cached copy is current
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            # Serve file inline (not as attachment) to allow PDF preview;
+            # FileResponse sets Content-Length and Content-Disposition
+            response = DocumentStorageService.open_stream(document.filepath, filename=document.filename)
         
-        # Sanitize filename for Content-Disposition header
-        safe_filename = document.filename.replace('"', '\\"')
-        # Use inline instead of attachment to allow PDF preview
-        response['Content-Disposition'] = f'inline; filename="{safe_filename}"'
-        response['Content-Length'] = document.filesize
-        
-        # Add CORS headers for frontend access
-        response['Access-Control-Allow-Origin'] = 'http://localhost:3000'
-        response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = DOWNLOAD_CACHE_CONTROL
         
         return response
         
     except Exception as e:
-        from django.http import HttpResponse
         response = HttpResponse(
             f'Failed to serve file: {str(e)}', 
             status=500,
@@ -220,51 +503,74 @@ def delete_document(request, document_id):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Get document from database
-    document = DatabaseService.get_document_by_id(document_id)
-    if not document:
-        raise Http404("Document not found")
-    
     try:
-        # Store file path for cleanup
-        file_path = document.filepath
-        
-        # Delete file from storage (even if it doesn't exist)
-        file_deleted = DocumentStorageService.delete_file(file_path)
-        
-        # Delete database record
-        record_deleted = DatabaseService.delete_document_record(document_id)
-        
-        if record_deleted:
-            message = 'Document deleted successfully'
-            if not file_deleted:
-                message += ' (file was already missing from storage)'
-            
-            return Response(
-                {'message': message}, 
-                status=status.HTTP_200_OK
-            )
-        else:
-            return Response(
-                {'error': 'Failed to delete document record'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-            
+        # Lock, delete and (after commit) unlink the file in one transaction
+        record_deleted, file_deleted = DatabaseService.delete_with_lock(document_id)
     except Exception as e:
         return Response(
             {'error': f'Failed to delete document: {str(e)}'}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+    
+    if not record_deleted:
+        raise Http404("Document not found")
+    
+    message = 'Document deleted successfully'
+    if not file_deleted:
+        message += ' (file was already missing from storage)'
+    
+    return Response(
+        {'message': message}, 
+        status=status.HTTP_200_OK
+    )
 
 
-@api_view(['GET'])
+@api_view(['GET', 'HEAD'])
 def health_check(request):
     """
     Comprehensive health check endpoint
     
     Validates database connectivity, file storage accessibility,
-    and overall system health.
+    and overall system health. The result is cached for a few seconds
+    so frequent orchestrator probes do not each hit the database.
     """
+    try:
+        health_status = cache.get(HEALTH_CACHE_KEY)
+    except Exception as e:
+        logger.warning(f"Health check cache read failed: {e}")
+        health_status = None
+    
+    if health_status is None:
+        health_status = _compute_health()
+        try:
+            cache.set(HEALTH_CACHE_KEY, health_status, HEALTH_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Health check cache write failed: {e}")
+    
+    # Return appropriate status code
+    status_code = status.HTTP_200_OK if health_status['status'] == 'healthy' else status.HTTP_503_SERVICE_UNAVAILABLE
+    
+    return Response(health_status, status=status_code)
+
+
+def _check_file_storage(media_root):
+    """Return 'healthy' or an 'unhealthy: ...' reason for the uploads directory"""
+    if not os.path.isdir(media_root) or not os.access(media_root, os.R_OK | os.W_OK | os.X_OK):
+        return 'unhealthy: uploads directory missing or not writable'
+    
+    if hasattr(os, 'statvfs'):
+        try:
+            stats = os.statvfs(media_root)
+        except OSError as e:
+            return f'unhealthy: {str(e)}'
+        if stats.f_bavail * stats.f_frsize < DocumentValidator.MAX_FILE_SIZE:
+            return 'unhealthy: insufficient free space for uploads'
+    
+    return 'healthy'
+
+
+def _compute_health():
+    """Run the health checks behind health_check"""
     health_status = {
         'status': 'healthy',
         'timestamp': timezone.now().isoformat(),
@@ -281,46 +587,22 @@ def health_check(request):
         health_status['checks']['database'] = f'unhealthy: {str(e)}'
         health_status['status'] = 'unhealthy'
     
-    try:
-        # File storage accessibility check
-        import tempfile
-        test_file = tempfile.NamedTemporaryFile(delete=False)
-        test_file.write(b'health check')
-        test_file.close()
-        
-        # Test storage operations
-        uploaded_file = SimpleUploadedFile(
-            name="health_check.pdf",
-            content=b'health check content',
-            content_type='application/pdf'
-        )
-        
-        file_path = DocumentStorageService.save_file(uploaded_file)
-        file_exists = DocumentStorageService.file_exists(file_path)
-        DocumentStorageService.delete_file(file_path)
-        
-        if file_exists:
-            health_status['checks']['file_storage'] = 'healthy'
-        else:
-            health_status['checks']['file_storage'] = 'unhealthy: file save/check failed'
-            health_status['status'] = 'unhealthy'
-            
-    except Exception as e:
-        health_status['checks']['file_storage'] = f'unhealthy: {str(e)}'
+    # File storage accessibility check: the uploads directory must exist,
+    # be readable and writable, and have room for a maximum-size upload
+    # (no test file is written)
+    health_status['checks']['file_storage'] = _check_file_storage(settings.MEDIA_ROOT)
+    if health_status['checks']['file_storage'] != 'healthy':
         health_status['status'] = 'unhealthy'
     
     # Document count check
     try:
-        document_count = Document.objects.count()
+        document_count = DatabaseService.get_document_count()
         health_status['checks']['document_count'] = document_count
     except Exception as e:
         health_status['checks']['document_count'] = f'error: {str(e)}'
         health_status['status'] = 'unhealthy'
     
-    # Return appropriate status code
-    status_code = status.HTTP_200_OK if health_status['status'] == 'healthy' else status.HTTP_503_SERVICE_UNAVAILABLE
-    
-    return Response(health_status, status=status_code)
+    return health_status
 
 
 @api_view(['POST'])
@@ -328,8 +610,9 @@ def analyze_document(request, document_id):
     """
     Analyze a document using AI
     
-    Performs AI-powered analysis of the document content using Google Gemini.
-    Returns analysis results including document type, key information, and insights.
+    Queues AI-powered analysis of the document content using Mistral and
+    returns immediately with a task ID. Poll the analysis or task status
+    endpoints for the result.
     """
     # Validate document_id
     try:
@@ -342,7 +625,7 @@ def analyze_document(request, document_id):
         )
     
     # Get document from database
-    document = DatabaseService.get_document_by_id(document_id)
+    document = DatabaseService.get_document_by_id(document_id, fields=ANALYZE_DOCUMENT_FIELDS)
     if not document:
         return Response(
             {'error': 'Document not found'}, 
@@ -357,8 +640,6 @@ def analyze_document(request, document_id):
         )
     
     try:
-        from .ai_analyzer import get_analyzer
-        
         analyzer = get_analyzer()
         if not analyzer:
             return Response(
@@ -366,27 +647,32 @@ def analyze_document(request, document_id):
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
         
-        # Check if already analyzing
-        if document.analysis_status == 'processing':
+        # The status column is the idempotency gate: only the request whose
+        # UPDATE flips it to processing queues a job, so concurrent clicks
+        # or client retries never analyze the same document twice
+        if not DatabaseService.claim_for_analysis(document.id):
             return Response(
                 {
                     'message': 'Document analysis is already in progress',
-                    'status': document.analysis_status
+                    'status': Document.Status.PROCESSING.name.lower()
                 },
                 status=status.HTTP_202_ACCEPTED
             )
         
-        # Start analysis
-        analysis_result = analyzer.analyze_document(document)
+        # Hand the slow PDF parse + Mistral call to a Celery worker
+        try:
+            task = analyze_document_task.delay(document.id)
+        except Exception:
+            DatabaseService.release_analysis_claim(document.id, document.analysis_status)
+            raise
         
         return Response(
             {
-                'message': 'Document analyzed successfully',
-                'analysis': analysis_result,
-                'status': document.analysis_status,
-                'analyzed_at': document.analyzed_at
+                'message': 'Document analysis started',
+                'task_id': task.id,
+                'status': Document.Status.PROCESSING.name.lower()
             },
-            status=status.HTTP_200_OK
+            status=status.HTTP_202_ACCEPTED
         )
         
     except Exception as e:
@@ -397,6 +683,82 @@ def analyze_document(request, document_id):
         )
 
 
+@api_view(['POST'])
+def analyze_documents_bulk(request):
+    """
+    Analyze several documents using AI
+    
+    Takes {"document_ids": [...]} and queues one task that analyzes the
+    documents together, batching their text into shared Mistral requests.
+    Documents already being analyzed are skipped. Poll the analysis or
+    task status endpoints for the results.
+    """
+    document_ids = request.data.get('document_ids') if hasattr(request.data, 'get') else None
+    if not isinstance(document_ids, list) or not document_ids:
+        return Response(
+            {'error': 'document_ids must be a non-empty list'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(document_ids) > MAX_BULK_ANALYZE_DOCUMENTS:
+        return Response(
+            {'error': f'Too many documents (maximum {MAX_BULK_ANALYZE_DOCUMENTS} per request)'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        document_ids = list(dict.fromkeys(InputValidator.validate_document_id(document_id) for document_id in document_ids))
+    except ValidationError as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    analyzer = get_analyzer()
+    if not analyzer:
+        return Response(
+            {'error': 'AI analyzer not available. Please check MISTRAL_API_KEY configuration.'}, 
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    
+    statuses = DatabaseService.get_analysis_statuses(document_ids)
+    not_found = [document_id for document_id in document_ids if document_id not in statuses]
+    if not statuses:
+        return Response(
+            {'error': 'Documents not found', 'not_found': not_found}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # Same idempotency gate as analyze_document, per document
+    queued, in_progress = [], []
+    for document_id in document_ids:
+        if document_id not in statuses:
+            continue
+        (queued if DatabaseService.claim_for_analysis(document_id) else in_progress).append(document_id)
+    
+    task_id = None
+    if queued:
+        try:
+            task_id = analyze_documents_batch_task.delay(queued).id
+        except Exception as e:
+            for document_id in queued:
+                DatabaseService.release_analysis_claim(document_id, statuses[document_id])
+            logger.error(f"Bulk document analysis failed: {e}")
+            return Response(
+                {'error': f'Analysis failed: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    return Response(
+        {
+            'message': 'Document analysis started' if queued else 'Document analysis is already in progress',
+            'task_id': task_id,
+            'queued': queued,
+            'in_progress': in_progress,
+            'not_found': not_found,
+        },
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
 @api_view(['GET'])
 def get_document_analysis(request, document_id):
     """
@@ -412,7 +774,7 @@ def get_document_analysis(request, document_id):
         )
     
     # Get document from database
-    document = DatabaseService.get_document_by_id(document_id)
+    document = DatabaseService.get_document_by_id(document_id, fields=ANALYSIS_RESULT_FIELDS)
     if not document:
         return Response(
             {'error': 'Document not found'}, 
@@ -422,8 +784,37 @@ def get_document_analysis(request, document_id):
     return Response(
         {
             'analysis': document.analysis_result,
-            'status': document.analysis_status,
+            'status': document.analysis_status_name,
             'analyzed_at': document.analyzed_at
         },
         status=status.HTTP_200_OK
-    )
\ No newline at end of file
+    )
+
+
+@api_view(['GET'])
+def get_analysis_task_status(request, task_id):
+    """
+    Get the state of a queued analysis task
+    """
+    result = AsyncResult(task_id)
+    
+    # The result backend (Redis by default) may be unreachable, e.g. when
+    # running with CELERY_TASK_ALWAYS_EAGER and no Redis
+    try:
+        response_data = {
+            'task_id': task_id,
+            'state': result.state
+        }
+        
+        if result.successful():
+            response_data['analysis'] = result.result
+        elif result.failed():
+            response_data['error'] = str(result.result)
+    except Exception as e:
+        logger.warning(f"Task status lookup failed for {task_id}: {e}")
+        return Response(
+            {'error': 'Task status is unavailable. Check the document analysis status instead.'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    
+    return Response(response_data, status=status.HTTP_200_OK)
@@ -0,0 +1,15 @@
+"""
+Celery application for medical_portal project.
+"""
+import os
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'medical_portal.settings')
+
+app = Celery('medical_portal')
+
+# Read CELERY_* settings from Django settings
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Load tasks.py from all installed apps
+app.autodiscover_tasks()
@@ -112,7 +112,8 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # JSONRenderer output, encoded with orjson when it is installed
+        'documents.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -134,8 +135,70 @@ CORS_ALLOW_CREDENTIALS = True
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 
-# Ensure uploads directory exists
+# Uploads are streamed to a temporary file (hashed as they arrive) rather
+# than buffered in memory, then renamed into MEDIA_ROOT. Keeping the
+# temporary directory inside MEDIA_ROOT keeps that rename on one filesystem.
+FILE_UPLOAD_HANDLERS = ['documents.upload_handlers.HashingTemporaryFileUploadHandler']
+FILE_UPLOAD_TEMP_DIR = MEDIA_ROOT / '.incoming'
+
+# Uploads are always checked for the %PDF header; set this to also run
+# libmagic over the stored file
+DOCUMENT_DEEP_CONTENT_VALIDATION = config('DOCUMENT_DEEP_CONTENT_VALIDATION', default=False, cast=bool)
+
+# Behind nginx, downloads can be handed back to it with X-Accel-Redirect
+# instead of being streamed by Django. NGINX_ACCEL_PREFIX must be an
+# `internal` location aliased to MEDIA_ROOT.
+USE_NGINX_ACCEL = config('USE_NGINX_ACCEL', default=False, cast=bool)
+NGINX_ACCEL_PREFIX = config('NGINX_ACCEL_PREFIX', default='/protected/')
+
+# Ensure uploads directories exist
 os.makedirs(MEDIA_ROOT, exist_ok=True)
+os.makedirs(FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+
+# Cache configuration (Redis when REDIS_URL is set, otherwise a
+# per-process memory cache for local development)
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# The document list is cached until an upload, delete or status change
+# invalidates it; the TTL only bounds how long superseded lists linger in
+# Redis. A per-process memory cache cannot see invalidations made by other
+# processes (e.g. the Celery worker), so it only keeps the list briefly.
+DOCUMENT_LIST_CACHE_TTL = 3600 if REDIS_URL else 5
+
+# Celery configuration (background AI analysis)
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default=CELERY_BROKER_URL)
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+# Tasks are queued from request handlers: reconnect once rather than backing
+# off for seconds when the broker is unreachable
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'max_retries': 1,
+    'interval_start': 0,
+    'interval_step': 0.2,
+    'interval_max': 0.5,
+}
+
+# A document left processing for longer than this (in seconds) by a lost or
+# killed analysis task can be claimed for analysis again. Covers one attempt
+# (HTTP retries included) plus queueing and the backoff before the next one.
+ANALYSIS_CLAIM_TIMEOUT = config('ANALYSIS_CLAIM_TIMEOUT', default=1800, cast=int)
 
 # Logging configuration
 LOGGING = {
@@ -15,6 +15,8 @@ const API_ENDPOINTS = {
 // Request timeout configuration
 const DEFAULT_TIMEOUT = 30000; // 30 seconds
 const UPLOAD_TIMEOUT = 120000; // 2 minutes for uploads
+const ANALYSIS_TIMEOUT = 120000; // 2 minutes for AI analysis
+const ANALYSIS_POLL_INTERVAL = 2000; // 2 seconds between status checks
 
 // Custom error class for API errors
 export class ApiError extends Error {
@@ -199,11 +201,34 @@ export class DocumentApiService {
           'Accept': 'application/json',
           'Content-Type': 'application/json',
         },
-      },
-      120000 // Longer timeout for AI analysis
+      }
     );
 
-    return handleResponse<{ message: string; analysis: string; status: string; analyzed_at: string }>(response);
+    // Analysis runs in a background worker - wait for it to finish
+    await handleResponse<{ message: string; status: string; task_id?: string }>(response);
+    return DocumentApiService.waitForAnalysis(documentId);
+  }
+
+  /**
+   * Poll analysis results until the background analysis finishes
+   */
+  static async waitForAnalysis(documentId: number): Promise<{ message: string; analysis: string; status: string; analyzed_at: string }> {
+    const deadline = Date.now() + ANALYSIS_TIMEOUT;
+
+    while (Date.now() < deadline) {
+      const result = await DocumentApiService.getDocumentAnalysis(documentId);
+
+      if (result.status === 'completed') {
+        return { message: 'Document analyzed successfully', ...result };
+      }
+      if (result.status === 'failed') {
+        throw new ApiError(result.analysis || 'Analysis failed', 500);
+      }
+
+      await new Promise(resolve => setTimeout(resolve, ANALYSIS_POLL_INTERVAL));
+    }
+
+    throw new ApiError('Analysis timeout', 408);
   }
 
   /**